@@ -0,0 +1,13 @@
+"""
+Script versions of the random forest training notebooks (dep_delay_rf,
+arr_rf, cancelled_prob_rf). Run from Models/ like the notebooks:
+
+    python -m training dep_delay_rf arr_rf cancelled_prob_rf -j 4
+
+--engine hgb trains histogram gradient boosting instead, and
+python -m training.benchmark compares the two engines per year.
+"""
+from .feature_cache import FeatureCache
+from .runner import FAMILIES, run, thread_budget
+
+__all__ = ['FAMILIES', 'FeatureCache', 'run', 'thread_budget']
@@ -0,0 +1,381 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.ensemble import (HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.metrics import (classification_report, mean_absolute_error,
+                             mean_squared_error, r2_score, roc_auc_score)
+
+from . import common, feature_cache
+
+OUTPUT_DIR = './arr_delay_rf_models/'
+
+CAT_FEATURES = ['DAY_NAME', 'MKT_AIRLINE', 'ORIGIN_IATA', 'DEST_IATA', 'FLIGHT_DISTANCE_CAT',
+                'IS_WEEKEND', 'EXTREME_WEATHER', 'DEST_EXTREME_WEATHER']
+NUM_FEATURES = ['DISTANCE', 'PRCP', 'DEST_PRCP', 'DEP_DELAY']
+
+DAY_NAMES = {
+    'Sun': 'Sunday', 'Mon': 'Monday', 'Tue': 'Tuesday', 'Wed': 'Wednesday',
+    'Thu': 'Thursday', 'Fri': 'Friday', 'Sat': 'Saturday'
+}
+DAY_NUMBERS = {'Sun': 0, 'Mon': 1, 'Tue': 2, 'Wed': 3, 'Thu': 4, 'Fri': 5, 'Sat': 6}
+
+
+def prepare_arrival_delay_data(df):
+    df = df.copy()
+    df['ARR_DELAY'] = pd.to_numeric(df['ARR_DELAY'], errors='coerce')
+
+    df['IS_ARR_DELAYED'] = (df['ARR_DELAY'] > 0).astype(int)
+    df['ARR_DELAY_CATEGORY'] = pd.cut(
+        df['ARR_DELAY'],
+        bins=[-float('inf'), -15, 0, 15, 30, 60, 120, float('inf')],
+        labels=['Very Early', 'Early', 'On Time', 'Slight Delay', 'Moderate Delay',
+                'Significant Delay', 'Severe Delay'],
+        include_lowest=True
+    )
+    df['ABS_ARR_DELAY'] = np.abs(df['ARR_DELAY'])
+    if 'DEP_DELAY' in df.columns:
+        df['ARR_WORSE_THAN_DEP'] = ((df['ARR_DELAY'] - df['DEP_DELAY']) > 0).astype(int)
+
+    delay_count = df['IS_ARR_DELAYED'].sum()
+    print(f"Delayed arrivals: {delay_count}/{len(df)} ({delay_count/len(df)*100:.2f}%)")
+    print(f"Mean arrival delay: {df['ARR_DELAY'].mean():.2f} minutes")
+    return df
+
+
+def create_day_features(df):
+    df = df.copy()
+    if 'WEEK' in df.columns:
+        df['DAY_NAME'] = df['WEEK'].map(DAY_NAMES)
+        df['DAY_OF_WEEK'] = df['WEEK'].map(DAY_NUMBERS)
+        df['IS_WEEKEND'] = df['WEEK'].isin(['Sat', 'Sun']).astype(int)
+    elif 'DAY_OF_WEEK' in df.columns:
+        if df['DAY_OF_WEEK'].max() == 7:
+            df['DAY_OF_WEEK'] = df['DAY_OF_WEEK'].replace({7: 0})
+        df['IS_WEEKEND'] = df['DAY_OF_WEEK'].isin([0, 6]).astype(int)
+        df['DAY_NAME'] = df['DAY_OF_WEEK'].map({v: DAY_NAMES[k] for k, v in DAY_NUMBERS.items()})
+    else:
+        print("Warning: No day of week column (WEEK or DAY_OF_WEEK) found")
+    return df
+
+
+def create_flight_duration_features(df):
+    df = df.copy()
+    if 'DISTANCE' in df.columns:
+        df['FLIGHT_DISTANCE_CAT'] = pd.cut(
+            df['DISTANCE'],
+            bins=[0, 300, 600, 1000, 1500, float('inf')],
+            labels=['Very Short (<300 mi)', 'Short (300-600 mi)', 'Medium (600-1000 mi)',
+                    'Long (1000-1500 mi)', 'Very Long (>1500 mi)']
+        )
+    return df
+
+
+def load_and_process_flight_data(file_path, top_airport_codes=None):
+    print(f"\nProcessing {os.path.basename(file_path)}...")
+    df = common.read_may_flights(file_path, top_airport_codes)
+
+    if 'ARR_DELAY' not in df.columns:
+        print(f"ARR_DELAY column not found in {os.path.basename(file_path)}. Skipping file.")
+        return None
+    if len(df) == 0:
+        return None
+
+    if 'CANCELLED' in df.columns:
+        df = df[df['CANCELLED'] == 0]
+    if 'DIVERTED' in df.columns:
+        df = df[df['DIVERTED'] == 0]
+    return df
+
+
+def analyze_delay_correlation(df, year, output_dir):
+    """
+    Distance/arrival delay correlation and the text report the notebook
+    writes next to its plots.
+    """
+    results = {}
+    distance_delay_corr = df['DISTANCE'].corr(df['ARR_DELAY'])
+    results['delay_correlation'] = distance_delay_corr
+    print(f"[{year}] Distance-Delay Pearson Correlation: {distance_delay_corr:.3f}")
+
+    df['DISTANCE_GROUP'] = pd.qcut(df['DISTANCE'], q=5)
+    delay_by_distance = df.groupby('DISTANCE_GROUP', observed=False)['ARR_DELAY'].mean().reset_index()
+
+    if 'DEP_DELAY' in df.columns:
+        results['mean_delay_diff'] = (df['ARR_DELAY'] - df['DEP_DELAY']).mean()
+        if 'ARR_WORSE_THAN_DEP' in df.columns:
+            results['pct_arr_worse_than_dep'] = df['ARR_WORSE_THAN_DEP'].mean() * 100
+
+    with open(os.path.join(output_dir, f"correlation_report_{year}.txt"), 'w') as f:
+        f.write(f"Annual Delay Analysis Report ({year})\n")
+        f.write("="*50 + "\n")
+        f.write(f"Distance-Delay Correlation: {distance_delay_corr:.3f}\n\n")
+        f.write("Delay Statistics by Distance Group:\n")
+        f.write(delay_by_distance.to_string(index=False) + "\n")
+    return results
+
+
+def build_feature_frame(flight_data_file, weather, top_airport_codes=None):
+    """
+    Load one year's flights, join origin and destination weather and add the
+    engineered features (the cacheable part of train_year_model).
+    """
+    flight_data = load_and_process_flight_data(flight_data_file, top_airport_codes)
+    if flight_data is None or len(flight_data) == 0:
+        return None
+
+    flight_data = common.match_weather(flight_data, weather)
+    flight_data = prepare_arrival_delay_data(flight_data)
+    flight_data = create_day_features(flight_data)
+    flight_data = create_flight_duration_features(flight_data)
+    return flight_data
+
+
+def make_models(engine, num_features, cat_features, n_jobs=-1):
+    """
+    (classifier, regressor) for an engine: the notebook's forests for 'rf',
+    histogram gradient boosting with native categories for 'hgb'.
+    """
+    if engine == 'hgb':
+        categorical = common.categorical_mask(num_features, cat_features)
+        return (
+            HistGradientBoostingClassifier(
+                max_iter=300,
+                learning_rate=0.1,
+                max_leaf_nodes=31,
+                min_samples_leaf=20,
+                l2_regularization=1.0,
+                class_weight='balanced',
+                categorical_features=categorical,
+                random_state=2025
+            ),
+            HistGradientBoostingRegressor(
+                max_iter=300,
+                learning_rate=0.1,
+                max_leaf_nodes=31,
+                min_samples_leaf=20,
+                l2_regularization=1.0,
+                categorical_features=categorical,
+                random_state=2025
+            ))
+    return (
+        RandomForestClassifier(
+            n_estimators=200,
+            max_depth=15,
+            min_samples_split=20,
+            min_samples_leaf=10,
+            class_weight='balanced',
+            random_state=2025,
+            n_jobs=n_jobs,
+            max_samples=0.9,
+            max_features='sqrt'
+        ),
+        RandomForestRegressor(
+            n_estimators=200,
+            max_depth=15,
+            min_samples_split=20,
+            min_samples_leaf=10,
+            random_state=2025,
+            max_samples=0.9,
+            max_features='sqrt',
+            n_jobs=n_jobs
+        ))
+
+
+def train_year_model(year, flight_data_file, weather, top_airport_codes=None,
+                     output_dir=OUTPUT_DIR, n_jobs=-1, cache=None, engine='rf'):
+    """
+    Port of arr_rf.ipynb's train_year_model: fits the arrival delay
+    classifier and regressor for one year and writes the models, feature
+    importances and arrival_delay_metrics_{year}.json under
+    output_dir/year_{year}/. With a FeatureCache, features and design
+    matrices are reused across runs. engine='hgb' swaps the forests for
+    gradient boosting, same artifacts.
+    """
+    print(f"\nTraining Arrival Delay model for year {year}")
+
+    year_output_dir = os.path.join(output_dir, f'year_{year}')
+    os.makedirs(os.path.join(year_output_dir, 'metrics'), exist_ok=True)
+    os.makedirs(os.path.join(year_output_dir, 'plots'), exist_ok=True)
+    start_time = time.time()
+
+    flight_data, key = feature_cache.feature_frame(
+        cache, build_feature_frame, year, 5, flight_data_file, weather, top_airport_codes)
+    if flight_data is None or len(flight_data) == 0:
+        print(f"No valid flight data available for {year}. Skipping this year.")
+        return None
+
+    # The notebook runs this before prepare_arrival_delay_data, so
+    # pct_arr_worse_than_dep is never set
+    corr_stats = analyze_delay_correlation(flight_data.drop(columns=['ARR_WORSE_THAN_DEP'], errors='ignore'),
+                                           year, os.path.join(year_output_dir, 'plots'))
+
+    cat_features = [f for f in CAT_FEATURES if f in flight_data.columns]
+    num_features = [f for f in NUM_FEATURES if f in flight_data.columns]
+
+    valid_mask = flight_data['ARR_DELAY'].notna()
+    X = common.fill_missing_features(flight_data.loc[valid_mask, cat_features + num_features].copy(),
+                                     cat_features, num_features)
+    y_class = flight_data.loc[valid_mask, 'IS_ARR_DELAYED']
+    y_reg = flight_data.loc[valid_mask, 'ARR_DELAY']
+
+    make_preprocessor = common.preprocessor_for(engine)
+    Xt_class, class_preprocessor, train_class, test_class = feature_cache.design_matrix(
+        cache, key, X, y_class, num_features, cat_features, make_preprocessor,
+        test_size=0.1, random_state=2025, stratify=True)
+    Xt_reg, reg_preprocessor, train_reg, test_reg = feature_cache.design_matrix(
+        cache, key, X, y_reg, num_features, cat_features, make_preprocessor,
+        test_size=0.1, random_state=2025, stratify=False)
+    y_test_class = y_class.iloc[test_class]
+    y_test_reg = y_reg.iloc[test_reg]
+
+    classifier, regressor = make_models(engine, num_features, cat_features, n_jobs)
+
+    class_model_start_time = time.time()
+    class_model = feature_cache.fit_estimator(
+        'classifier', classifier, Xt_class, class_preprocessor, y_class, train_class)
+    class_model_training_time = time.time() - class_model_start_time
+    print(f"[{year}] Arrival delay classification model training took: {class_model_training_time:.2f} seconds")
+
+    reg_model_start_time = time.time()
+    reg_model = feature_cache.fit_estimator(
+        'regressor', regressor, Xt_reg, reg_preprocessor, y_reg, train_reg)
+    reg_model_training_time = time.time() - reg_model_start_time
+    print(f"[{year}] Arrival delay regression model training took: {reg_model_training_time:.2f} seconds")
+
+    classifier = class_model.named_steps['classifier']
+    y_pred_class = classifier.predict(Xt_class[test_class])
+    y_prob_class = classifier.predict_proba(Xt_class[test_class])[:, 1]
+    class_accuracy = (y_pred_class == y_test_class).mean() * 100
+    class_roc_auc = roc_auc_score(y_test_class, y_prob_class)
+    class_report = classification_report(y_test_class, y_pred_class, output_dict=True)
+
+    y_pred_reg = reg_model.named_steps['regressor'].predict(Xt_reg[test_reg])
+    reg_mse = mean_squared_error(y_test_reg, y_pred_reg)
+    reg_rmse = np.sqrt(reg_mse)
+    reg_mae = mean_absolute_error(y_test_reg, y_pred_reg)
+    reg_r2 = r2_score(y_test_reg, y_pred_reg)
+    print(f"[{year}] Arrival delay classification AUC: {class_roc_auc:.4f}, "
+          f"regression RMSE: {reg_rmse:.2f} minutes")
+
+    class_importance_df = common.feature_importance(class_model, 'classifier',
+                                                    Xt_class[test_class], y_test_class)
+    class_importance_df.to_csv(
+        os.path.join(year_output_dir, 'metrics', f"arrival_delay_class_feature_importance_{year}.csv"),
+        index=False)
+    reg_importance_df = common.feature_importance(reg_model, 'regressor',
+                                                  Xt_reg[test_reg], y_test_reg)
+    reg_importance_df.to_csv(
+        os.path.join(year_output_dir, 'metrics', f"arrival_delay_reg_feature_importance_{year}.csv"),
+        index=False)
+
+    dump(class_model, os.path.join(year_output_dir, f"arr_delay_class_model_{year}.joblib"))
+    dump(reg_model, os.path.join(year_output_dir, f"arr_delay_reg_model_{year}.joblib"))
+    print(f"Models saved to {year_output_dir}")
+
+    metrics = {
+        'model_name': f'arrival_delay_{engine}_{year}',
+        'engine': engine,
+        'year': year,
+        'total_flights': len(flight_data),
+        'arr_delayed_flights_rate': flight_data['IS_ARR_DELAYED'].mean() * 100,
+        'mean_arr_delay': flight_data['ARR_DELAY'].mean(),
+        'median_arr_delay': flight_data['ARR_DELAY'].median(),
+        'max_arr_delay': flight_data['ARR_DELAY'].max(),
+        'min_arr_delay': flight_data['ARR_DELAY'].min(),
+        'dep_arr_delay_correlation': corr_stats.get('delay_correlation', None),
+        'mean_delay_difference': corr_stats.get('mean_delay_diff', None),
+        'pct_arr_worse_than_dep': corr_stats.get('pct_arr_worse_than_dep', None),
+        'class_accuracy': class_accuracy,
+        'class_roc_auc': class_roc_auc,
+        'class_precision': class_report['1']['precision'],
+        'class_recall': class_report['1']['recall'],
+        'class_f1': class_report['1']['f1-score'],
+        'class_training_time': class_model_training_time,
+        'reg_mse': reg_mse,
+        'reg_rmse': reg_rmse,
+        'reg_mae': reg_mae,
+        'reg_r2': reg_r2,
+        'reg_training_time': reg_model_training_time,
+        'status': 'success',
+        'total_processing_time': time.time() - start_time
+    }
+    common.add_top_features(metrics, class_importance_df, 'class_')
+    common.add_top_features(metrics, reg_importance_df, 'reg_')
+
+    feature_names = class_model.named_steps['preprocessor'].get_feature_names_out()
+    day_features = [f for f in feature_names if 'DAY_NAME' in f]
+    if day_features:
+        metrics['day_features'] = day_features
+        metrics['day_importance_class'] = class_importance_df[
+            class_importance_df['Feature'].isin(day_features)].to_dict('records')
+        metrics['day_importance_reg'] = reg_importance_df[
+            reg_importance_df['Feature'].isin(day_features)].to_dict('records')
+
+    common.save_json(metrics, os.path.join(year_output_dir, 'metrics', f'arrival_delay_metrics_{year}.json'))
+    print(f"\nArrival delay model training for {year} complete! "
+          f"Total processing time: {metrics['total_processing_time']:.2f} seconds")
+    return metrics
+
+
+def compare_year_models(all_results, output_dir=OUTPUT_DIR):
+    """
+    The notebook's comparison tables (figures stay in the notebook).
+    """
+    print("\nComparing arrival delay models across years...")
+    if not all_results or len(all_results) < 2:
+        print("Not enough year models to compare.")
+        return
+
+    comparison_dir = os.path.join(output_dir, 'comparison')
+    os.makedirs(comparison_dir, exist_ok=True)
+    years = sorted([r['year'] for r in all_results])
+
+    class_metrics = pd.DataFrame({
+        'Year': years,
+        'Accuracy (%)': [r['class_accuracy'] for r in all_results],
+        'AUC': [r['class_roc_auc'] for r in all_results],
+        'Precision': [r['class_precision'] for r in all_results],
+        'Recall': [r['class_recall'] for r in all_results],
+        'F1 Score': [r['class_f1'] for r in all_results],
+    })
+    reg_metrics = pd.DataFrame({
+        'Year': years,
+        'RMSE (min)': [r['reg_rmse'] for r in all_results],
+        'MAE (min)': [r['reg_mae'] for r in all_results],
+        'R² Score': [r['reg_r2'] for r in all_results],
+    })
+    delay_stats = pd.DataFrame({
+        'Year': years,
+        'Mean Arrival Delay (min)': [r['mean_arr_delay'] for r in all_results],
+        'Arrival Delay Rate (%)': [r['arr_delayed_flights_rate'] for r in all_results],
+        'Total Flights': [r['total_flights'] for r in all_results],
+    })
+
+    summary_data = pd.concat([
+        delay_stats.set_index('Year'),
+        class_metrics.set_index('Year').iloc[:, 1:],
+        reg_metrics.set_index('Year').iloc[:, 1:]
+    ], axis=1)
+
+    corr_data = [{
+        'Year': r['year'],
+        'Correlation': r['dep_arr_delay_correlation'],
+        'Mean Diff (min)': r['mean_delay_difference'],
+        'Arrival Worse (%)': r['pct_arr_worse_than_dep']
+    } for r in all_results if r.get('dep_arr_delay_correlation') is not None]
+    if corr_data and all(v is not None for entry in corr_data for v in entry.values()):
+        summary_data = pd.concat([summary_data, pd.DataFrame(corr_data).set_index('Year')], axis=1)
+
+    summary_data.to_csv(os.path.join(comparison_dir, 'arr_delay_model_comparison.csv'))
+    print(f"Comparison summary saved to {os.path.join(comparison_dir, 'arr_delay_model_comparison.csv')}")
+
+    features_data = {
+        'classification': common.top_features_by_year(all_results, 'class_', 5),
+        'regression': common.top_features_by_year(all_results, 'reg_', 5)
+    }
+    common.save_json(features_data, os.path.join(comparison_dir, 'arrival_delay_feature_importance_by_year.json'))
+    print("Arrival delay model comparison completed!")
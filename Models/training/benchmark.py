@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import load
+
+import weather_join
+
+from . import common, feature_cache, runner
+
+# Per family: (task, artifact under the family's output dir, quality metric,
+# fit-time metric) for each model it writes
+MODELS = {
+    'dep_delay_rf': [
+        ('class', 'year_{year}/rf_class_model_{year}.joblib', 'class_roc_auc', 'class_training_time'),
+        ('reg', 'year_{year}/rf_reg_model_{year}.joblib', 'reg_rmse', 'reg_training_time'),
+    ],
+    'arr_rf': [
+        ('class', 'year_{year}/arr_delay_class_model_{year}.joblib', 'class_roc_auc', 'class_training_time'),
+        ('reg', 'year_{year}/arr_delay_reg_model_{year}.joblib', 'reg_rmse', 'reg_training_time'),
+    ],
+    'cancelled_prob_rf': [
+        ('class', 'May{year}_model.joblib', 'roc_auc', 'training_time'),
+    ],
+}
+LATENCY_ROWS = 200
+NEGATIVE_RATES = [1.0, 0.5, 0.2, 0.1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def model_inputs(model, frame):
+    """
+    The raw feature columns a saved pipeline was fitted on, filled the way
+    the training scripts fill them.
+    """
+    columns = {name: list(cols) for name, _, cols in model.named_steps['preprocessor'].transformers_
+               if name in ('num', 'cat')}
+    X = frame[columns['cat'] + columns['num']].copy()
+    return common.fill_missing_features(X, columns['cat'], columns['num'])
+
+
+def single_row_latency(model, X, task, n_rows=LATENCY_ROWS, seed=2025):
+    """
+    p50 and p99 milliseconds for predicting one DataFrame row through the
+    whole pipeline, as a serving endpoint would.
+    """
+    predict = model.predict_proba if task == 'class' else model.predict
+    rows = np.random.default_rng(seed).choice(len(X), size=min(n_rows, len(X)), replace=False)
+    predict(X.iloc[rows[:1]])
+    times = []
+    for i in rows:
+        start = time.perf_counter()
+        predict(X.iloc[[i]])
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000
+
+
+def run_benchmark(families, years=common.YEARS, flight_data_path=common.FLIGHT_DATA_PATH,
+                  weather_data_path=common.WEATHER_DATA_PATH,
+                  top_airports_file=common.TOP_AIRPORTS_FILE, work_dir='./model_benchmark/',
+                  workers=None, threads_per_job=None, cache_dir=feature_cache.FEATURE_CACHE_PATH,
+                  engines=common.ENGINES, weather_store_path=common.WEATHER_STORE_PATH):
+    """
+    Train every family with each engine into work_dir, then measure each
+    saved model: fit time, artifact size, single-row latency and AUC/RMSE.
+    Returns one row per (family, year, task, engine).
+    """
+    trained = {}
+    for engine in engines:
+        results = runner.run(families, years, flight_data_path, weather_data_path, top_airports_file,
+                             work_dir, workers, threads_per_job, cache_dir, engine,
+                             weather_store_path=weather_store_path)
+        for family, family_results in results.items():
+            for r in family_results:
+                if r and r.get('status', 'success') == 'success':
+                    trained[(family, r.get('year', r.get('file_year')), engine)] = r
+
+    print("\nMeasuring saved models...")
+    flight_files = common.get_may_files(flight_data_path, years)
+    top_airport_codes = common.load_top_airports(top_airports_file)
+    weather = weather_join.build_weather_table(
+        common.load_weather_data(weather_data_path, top_airport_codes, sorted(flight_files),
+                                 weather_store_path))
+    cache = feature_cache.FeatureCache(cache_dir) if cache_dir else None
+
+    rows = []
+    for family in families:
+        module = runner.FAMILIES[family]
+        for year in sorted(flight_files):
+            frame = None
+            for task, artifact, metric, time_key in MODELS[family]:
+                for engine in engines:
+                    result = trained.get((family, year, engine))
+                    if result is None:
+                        continue
+                    if frame is None:
+                        frame, _ = feature_cache.feature_frame(
+                            cache, module.build_feature_frame, year, 5, flight_files[year],
+                            weather, top_airport_codes)
+                    path = os.path.join(runner.output_dir_for(family, engine, work_dir),
+                                        artifact.format(year=year))
+                    model = load(path)
+                    p50, p99 = single_row_latency(model, model_inputs(model, frame), task)
+                    row = {
+                        'family': family,
+                        'year': year,
+                        'task': task,
+                        'engine': engine,
+                        'fit_time': result[time_key],
+                        'artifact_mb': os.path.getsize(path) / 1024 ** 2,
+                        'p50_ms': p50,
+                        'p99_ms': p99,
+                        'metric': 'auc' if task == 'class' else 'rmse',
+                        'value': result[metric],
+                    }
+                    rows.append(row)
+                    print(f"{family:>18} {year} {task:>5} {engine:>4}: fit {row['fit_time']:8.2f}s "
+                          f"{row['artifact_mb']:8.1f} MB p50 {p50:7.2f} ms p99 {p99:7.2f} ms "
+                          f"{row['metric']} {row['value']:.4f}")
+    return rows
+
+
+def run_downsampling(negative_rates=NEGATIVE_RATES, years=common.YEARS,
+                     flight_data_path=common.FLIGHT_DATA_PATH,
+                     weather_data_path=common.WEATHER_DATA_PATH,
+                     top_airports_file=common.TOP_AIRPORTS_FILE, work_dir='./model_benchmark/',
+                     workers=None, threads_per_job=None,
+                     cache_dir=feature_cache.FEATURE_CACHE_PATH, engines=common.ENGINES,
+                     weather_store_path=common.WEATHER_STORE_PATH):
+    """
+    Train the cancellation models at each negative sampling rate and
+    compare fit time and test metrics against the full data (rate 1).
+    Returns one row per (engine, year, rate).
+    """
+    negative_rates = sorted(set(negative_rates) | {1.0}, reverse=True)
+    rows = []
+    for engine in engines:
+        by_rate = {}
+        for rate in negative_rates:
+            results = runner.run(['cancelled_prob_rf'], years, flight_data_path, weather_data_path,
+                                 top_airports_file, os.path.join(work_dir, f'negative_rate_{rate:g}'),
+                                 workers, threads_per_job, cache_dir, engine, rate,
+                                 weather_store_path)
+            by_rate[rate] = {r['file_year']: r for r in results.get('cancelled_prob_rf', [])
+                             if r.get('status') == 'success'}
+
+        print(f"\nNegative downsampling ({engine}):")
+        for year, base in sorted(by_rate[1.0].items()):
+            for rate in negative_rates:
+                result = by_rate[rate].get(year)
+                if result is None:
+                    continue
+                row = {
+                    'engine': engine,
+                    'year': year,
+                    'negative_rate': rate,
+                    'fit_rows': result['fit_rows'],
+                    'fit_time': result['training_time'],
+                    'speedup': base['training_time'] / max(result['training_time'], 1e-9),
+                    'roc_auc': result['roc_auc'],
+                    'auc_change': result['roc_auc'] - base['roc_auc'],
+                    'brier_score': result['brier_score'],
+                    'brier_change': result['brier_score'] - base['brier_score'],
+                    'cancellation_rate': result['cancellation_rate'],
+                    'mean_predicted_rate': result['mean_predicted_rate'],
+                }
+                rows.append(row)
+                print(f"{year} rate {rate:5g}: {row['fit_rows']:>9} rows fit {row['fit_time']:8.2f}s "
+                      f"({row['speedup']:5.1f}x) auc {row['roc_auc']:.4f} ({row['auc_change']:+.4f}) "
+                      f"brier {row['brier_score']:.5f} ({row['brier_change']:+.5f}) "
+                      f"predicted {row['mean_predicted_rate']:.2f}% vs {row['cancellation_rate']:.2f}%")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the random forest and gradient boosting engines per year.")
+    parser.add_argument("--families", nargs="+", choices=sorted(runner.FAMILIES),
+                        default=list(runner.FAMILIES))
+    parser.add_argument("--years", type=int, nargs="+", default=common.YEARS)
+    parser.add_argument("--flight-data", default=common.FLIGHT_DATA_PATH)
+    parser.add_argument("--weather-data", default=common.WEATHER_DATA_PATH)
+    parser.add_argument("--weather-store", default=common.WEATHER_STORE_PATH)
+    parser.add_argument("--top-airports", default=common.TOP_AIRPORTS_FILE)
+    parser.add_argument("--engines", nargs="+", choices=common.ENGINES, default=common.ENGINES)
+    parser.add_argument("--work-dir", default="./model_benchmark/",
+                        help="where each engine's models are written")
+    parser.add_argument("-o", "--output", default="model_benchmark.json",
+                        help="JSON report; a CSV of the rows is written next to it")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--threads-per-job", type=int, default=None)
+    parser.add_argument("--cache-dir", default=feature_cache.FEATURE_CACHE_PATH)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--negative-rates", type=float, nargs="+", default=None,
+                        help="instead, compare cancellation models trained on these fractions "
+                             "of non-cancelled flights against the full data")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    engines = list(dict.fromkeys(args.engines))
+    if args.negative_rates:
+        if any(not 0 < rate <= 1 for rate in args.negative_rates):
+            parser.error("--negative-rates must be in (0, 1]")
+        rows = run_downsampling(args.negative_rates, args.years, args.flight_data, args.weather_data,
+                                args.top_airports, args.work_dir, args.workers, args.threads_per_job,
+                                cache_dir, engines, args.weather_store)
+    else:
+        rows = run_benchmark(list(dict.fromkeys(args.families)), args.years, args.flight_data,
+                             args.weather_data, args.top_airports, args.work_dir, args.workers,
+                             args.threads_per_job, cache_dir, engines, args.weather_store)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sklearn': sklearn.__version__,
+        'latency_rows': LATENCY_ROWS,
+        'results': rows
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(common.convert_to_serializable(report), f, indent=2)
+    pd.DataFrame(rows).to_csv(os.path.splitext(args.output)[0] + '.csv', index=False)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
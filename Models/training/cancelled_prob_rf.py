@@ -0,0 +1,325 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import brier_score_loss, classification_report, confusion_matrix, roc_auc_score
+
+from . import common, feature_cache
+from .sampling import NegativeDownsampledClassifier
+
+OUTPUT_DIR = './cancelled_prob_rf_models/'
+
+CAT_FEATURES = ['YEAR', 'WEEK', 'MKT_AIRLINE', 'ORIGIN_IATA', 'DEST_IATA', 'IS_REDEYE',
+                'IS_WEEKEND', 'IS_MORNING_PEAK', 'IS_EVENING_PEAK', 'EXTREME_WEATHER', 'DEST_EXTREME_WEATHER']
+NUM_FEATURES = ['DISTANCE', 'PRCP', 'DEST_PRCP']
+INDICATORS = ['IS_REDEYE', 'IS_WEEKEND', 'IS_MORNING_PEAK', 'IS_EVENING_PEAK']
+
+DAY_NUMBERS = {
+    'Sun': 0, 'Sunday': 0, 'Mon': 1, 'Monday': 1, 'Tue': 2, 'Tuesday': 2,
+    'Wed': 3, 'Wednesday': 3, 'Thu': 4, 'Thursday': 4, 'Fri': 5, 'Friday': 5,
+    'Sat': 6, 'Saturday': 6
+}
+
+
+def _first_column(df, name):
+    cols = [col for col in df.columns if name in col.upper()]
+    return cols[0] if cols else None
+
+
+def standardize_day_of_week(df):
+    """
+    WEEK as an integer with Sun=0, Mon=1, ..., Sat=6.
+    """
+    df = df.copy()
+    if 'WEEK' not in df.columns:
+        if 'DAY_OF_WEEK' in df.columns:
+            df['WEEK'] = df['DAY_OF_WEEK']
+        elif all(col in df.columns for col in ['YEAR', 'MONTH', 'DAY']):
+            df['WEEK'] = (pd.to_datetime(df[['YEAR', 'MONTH', 'DAY']]).dt.dayofweek + 1) % 7
+        else:
+            print("Cannot create WEEK column. Required columns missing.")
+            return df
+
+    if df['WEEK'].dtype == 'object':
+        df['WEEK'] = df['WEEK'].map(DAY_NUMBERS)
+    df['WEEK'] = df['WEEK'].astype(int)
+    return df
+
+
+def create_redeye_indicator(df):
+    """
+    IS_REDEYE from the first *DEP_TIME* and *ARR_TIME* columns (0 to 6 AM).
+    """
+    df = df.copy()
+    df['IS_REDEYE'] = 0
+    for name in ['DEP_TIME', 'ARR_TIME']:
+        col = _first_column(df, name)
+        if col is not None:
+            df[col] = df[col].astype(float)
+            df.loc[(df[col] >= 0) & (df[col] < 600), 'IS_REDEYE'] = 1
+
+    redeye_count = df['IS_REDEYE'].sum()
+    print(f"Identified {redeye_count} red-eye flights out of {len(df)} total flights "
+          f"({redeye_count/len(df)*100:.2f}%)")
+    return df
+
+
+def create_indicator_variables(df):
+    """
+    IS_WEEKEND, IS_MORNING_PEAK (7-10 AM) and IS_EVENING_PEAK (4-7 PM).
+    """
+    df = df.copy()
+    df['IS_WEEKEND'] = 0
+    df['IS_MORNING_PEAK'] = 0
+    df['IS_EVENING_PEAK'] = 0
+
+    if 'WEEK' in df.columns:
+        df.loc[(df['WEEK'] == 0) | (df['WEEK'] == 6), 'IS_WEEKEND'] = 1
+
+    dep_time_col = _first_column(df, 'DEP_TIME')
+    if dep_time_col is not None:
+        df[dep_time_col] = df[dep_time_col].astype(float)
+        df.loc[(df[dep_time_col] >= 700) & (df[dep_time_col] < 1000), 'IS_MORNING_PEAK'] = 1
+        df.loc[(df[dep_time_col] >= 1600) & (df[dep_time_col] < 1900), 'IS_EVENING_PEAK'] = 1
+    return df
+
+
+def _cancel_rate(df):
+    return df['IS_CANCELLED'].mean() * 100 if len(df) > 0 else None
+
+
+def build_feature_frame(file_path, weather, top_airport_codes=None):
+    """
+    Load one MayYYYY.csv, add the indicator features and IS_CANCELLED and
+    join origin and destination weather (the cacheable part of
+    train_model_for_file).
+    """
+    flight_df = common.read_may_flights(file_path, top_airport_codes, filter_year=False)
+    if len(flight_df) == 0:
+        return flight_df
+
+    flight_df = standardize_day_of_week(flight_df)
+    flight_df = create_redeye_indicator(flight_df)
+    flight_df = create_indicator_variables(flight_df)
+    if 'CANCELLED' in flight_df.columns:
+        flight_df['IS_CANCELLED'] = flight_df['CANCELLED'].astype(int)
+    return common.match_weather(flight_df, weather)
+
+
+def make_model(engine, num_features, cat_features, n_jobs=-1):
+    """
+    The notebook's forest for 'rf', histogram gradient boosting with native
+    categories and the same class weights for 'hgb'.
+    """
+    if engine == 'hgb':
+        return HistGradientBoostingClassifier(
+            max_iter=200,
+            learning_rate=0.05,
+            max_depth=8,
+            min_samples_leaf=50,
+            l2_regularization=1.0,
+            class_weight={0: 1, 1: 5},
+            categorical_features=common.categorical_mask(num_features, cat_features),
+            random_state=2025
+        )
+    return RandomForestClassifier(
+        n_estimators=250,
+        max_depth=8,
+        min_samples_split=20,
+        min_samples_leaf=10,
+        class_weight={0: 1, 1: 5},
+        max_features='sqrt',
+        max_samples=0.9,
+        random_state=2025,
+        n_jobs=n_jobs
+    )
+
+
+def train_model_for_file(file_path, weather, top_airport_codes=None,
+                         output_dir=OUTPUT_DIR, n_jobs=-1, cache=None, engine='rf',
+                         negative_rate=1.0):
+    """
+    Port of cancelled_prob_rf.ipynb's train_model_for_file: fits the
+    cancellation classifier for one MayYYYY.csv and writes
+    {model_name}_model.joblib and its feature importances to output_dir.
+    Returns the metrics dict, or a status/reason dict if the file is skipped.
+    With a FeatureCache, features and the design matrix are reused across runs.
+    engine='hgb' swaps the forest for gradient boosting, same artifacts.
+    negative_rate < 1 fits on every cancelled flight and that fraction of
+    the others, with probabilities corrected back to the true base rate
+    (the test set is never sampled).
+    """
+    file_name = os.path.basename(file_path)
+    model_name = os.path.splitext(file_name)[0]
+    file_year = common.extract_year_from_filename(file_name)
+    print(f"\nProcessing file: {file_name} (May {file_year})")
+
+    os.makedirs(os.path.join(output_dir, 'metrics'), exist_ok=True)
+    start_time = time.time()
+
+    try:
+        flight_df, key = feature_cache.feature_frame(
+            cache, build_feature_frame, file_year, 5, file_path, weather, top_airport_codes)
+    except Exception as e:
+        print(f"Error loading flight data file {file_path}: {e}")
+        return {'file_name': file_name, 'status': 'error', 'reason': str(e)}
+    if len(flight_df) == 0:
+        print("No data remaining after filtering for top 30 airports. Skipping file.")
+        return {'file_name': file_name, 'status': 'skipped', 'reason': 'empty_after_filtering'}
+
+    if 'IS_CANCELLED' not in flight_df.columns:
+        print("No CANCELLED column found. Skipping file.")
+        return {'file_name': file_name, 'status': 'skipped', 'reason': 'no_cancelled_column'}
+
+    cancelled_count = flight_df['IS_CANCELLED'].sum()
+    if cancelled_count == 0:
+        print("No cancelled flights in this dataset. Skipping file.")
+        return {'file_name': file_name, 'status': 'skipped', 'reason': 'no_cancelled_flights'}
+    cancellation_rate = cancelled_count / len(flight_df) * 100
+    print(f"[{model_name}] Overall cancellation rate: {cancelled_count}/{len(flight_df)} ({cancellation_rate:.2f}%)")
+
+    redeye_df = flight_df[flight_df['IS_REDEYE'] == 1]
+    non_redeye_df = flight_df[flight_df['IS_REDEYE'] == 0]
+    weekend_df = flight_df[flight_df['IS_WEEKEND'] == 1]
+    weekday_df = flight_df[flight_df['IS_WEEKEND'] == 0]
+    morning_peak_df = flight_df[flight_df['IS_MORNING_PEAK'] == 1]
+    evening_peak_df = flight_df[flight_df['IS_EVENING_PEAK'] == 1]
+    off_peak_df = flight_df[(flight_df['IS_MORNING_PEAK'] == 0) & (flight_df['IS_EVENING_PEAK'] == 0)]
+
+    cat_features = [f for f in CAT_FEATURES if f in flight_df.columns]
+    num_features = [f for f in NUM_FEATURES if f in flight_df.columns]
+    if not cat_features or not num_features:
+        print("Missing required features. Skipping file.")
+        return {'file_name': file_name, 'status': 'skipped', 'reason': 'missing_required_features'}
+
+    X = common.fill_missing_features(flight_df[cat_features + num_features].copy(),
+                                     cat_features, num_features)
+    y = flight_df['IS_CANCELLED'].copy()
+    Xt, preprocessor, train_index, test_index = feature_cache.design_matrix(
+        cache, key, X, y, num_features, cat_features, common.preprocessor_for(engine),
+        test_size=0.2, random_state=2025, stratify=True)
+    X_test, y_test = X.iloc[test_index], y.iloc[test_index]
+
+    classifier = make_model(engine, num_features, cat_features, n_jobs)
+    if negative_rate < 1:
+        classifier = NegativeDownsampledClassifier(classifier, negative_rate, random_state=2025)
+        print(f"[{model_name}] Keeping all cancellations and {negative_rate:.1%} of other flights")
+
+    model_start_time = time.time()
+    model = feature_cache.fit_estimator('classifier', classifier, Xt, preprocessor, y, train_index)
+    model_training_time = time.time() - model_start_time
+    fit_rows = getattr(model.named_steps['classifier'], 'n_samples_fit_', len(train_index))
+    y_pred = model.named_steps['classifier'].predict(Xt[test_index])
+    y_prob = model.named_steps['classifier'].predict_proba(Xt[test_index])[:, 1]
+    feature_importance = common.feature_importance(model, 'classifier', Xt[test_index], y_test)
+    print(f"[{model_name}] Model training took: {model_training_time:.2f} seconds")
+
+    try:
+        accuracy = (y_pred == y_test).mean() * 100
+        roc_auc = roc_auc_score(y_test, y_prob)
+        report = classification_report(y_test, y_pred, output_dict=True)
+        cm = confusion_matrix(y_test, y_pred)
+        print(f"[{model_name}] Accuracy: {accuracy:.2f}%, ROC AUC: {roc_auc:.4f}")
+
+        feature_importance.to_csv(
+            os.path.join(output_dir, 'metrics', f"{model_name}_feature_importance.csv"), index=False)
+
+        # Mean change in predicted probability when each indicator is forced on vs off
+        indicator_effects = {}
+        for indicator in INDICATORS:
+            if indicator in X_test.columns:
+                positive_probs = model.predict_proba(X_test.assign(**{indicator: 1}))[:, 1]
+                negative_probs = model.predict_proba(X_test.assign(**{indicator: 0}))[:, 1]
+                indicator_effects[indicator] = np.mean(positive_probs - negative_probs)
+
+        model_path = os.path.join(output_dir, f"{model_name}_model.joblib")
+        dump(model, model_path)
+        print(f"Model saved to {model_path}")
+
+        metrics = {
+            'file_name': file_name,
+            'model_name': model_name,
+            'engine': engine,
+            'file_year': file_year,
+            'accuracy': accuracy,
+            'roc_auc': roc_auc,
+            'precision': report['1']['precision'],
+            'recall': report['1']['recall'],
+            'f1_score': report['1']['f1-score'],
+            'cancellation_rate': cancellation_rate,
+            'training_time': model_training_time,
+            'training_size': len(train_index),
+            'negative_rate': negative_rate,
+            'fit_rows': fit_rows,
+            'brier_score': brier_score_loss(y_test, y_prob),
+            'mean_predicted_rate': np.mean(y_prob) * 100,
+            'test_size': len(X_test),
+            'status': 'success'
+        }
+        for name, subset, rate_key, other_key, other in [
+                ('redeye', redeye_df, 'redeye_cancel_rate', 'non_redeye_cancel_rate', non_redeye_df),
+                ('weekend', weekend_df, 'weekend_cancel_rate', 'weekday_cancel_rate', weekday_df)]:
+            metrics[f'{name}_count'] = len(subset)
+            metrics[f'{name}_percentage'] = len(subset) / len(flight_df) * 100
+            metrics[rate_key] = _cancel_rate(subset)
+            metrics[other_key] = _cancel_rate(other)
+        for name, subset in [('morning_peak', morning_peak_df), ('evening_peak', evening_peak_df),
+                             ('off_peak', off_peak_df)]:
+            metrics[f'{name}_count'] = len(subset)
+            metrics[f'{name}_percentage'] = len(subset) / len(flight_df) * 100
+            metrics[f'{name}_cancel_rate'] = _cancel_rate(subset)
+
+        importance_by_feature = dict(zip(feature_importance['Feature'], feature_importance['Importance']))
+        for indicator in INDICATORS:
+            for feat in feature_importance['Feature']:
+                if indicator in feat:
+                    metrics[f'{indicator.lower()}_importance'] = importance_by_feature[feat]
+        for feat in feature_importance['Feature']:
+            if 'PRCP' in feat or 'EXTREME_WEATHER' in feat:
+                feat_key = feat.replace('cat__', '').replace('num__', '')
+                metrics[f'{feat_key}_importance'] = importance_by_feature[feat]
+
+        for indicator, avg_effect in indicator_effects.items():
+            metrics[f'{indicator.lower()}_effect'] = avg_effect
+
+        metrics['true_negative'] = cm[0, 0]
+        metrics['false_positive'] = cm[0, 1]
+        metrics['false_negative'] = cm[1, 0]
+        metrics['true_positive'] = cm[1, 1]
+
+        common.add_top_features(metrics, feature_importance, '', n=5)
+
+        dest_matched = flight_df['DEST_PRCP'].notnull().sum() if 'DEST_PRCP' in flight_df.columns else 0
+        metrics['origin_weather_match_rate'] = flight_df['PRCP'].notnull().sum() / len(flight_df) * 100
+        metrics['dest_weather_match_rate'] = dest_matched / len(flight_df) * 100
+
+        print(f"Processing of {file_name} completed in {time.time() - start_time:.2f} seconds")
+        return common.convert_to_serializable(metrics)
+    except Exception as e:
+        print(f"Error in evaluation: {e}")
+        return {'file_name': file_name, 'status': 'error', 'reason': str(e)}
+
+
+def summarize(results, output_dir=OUTPUT_DIR):
+    """
+    The notebook's cancelled_prob_rf_summary.csv and average metrics.
+    """
+    success = [r for r in results if r.get('status') == 'success']
+    print("\nSummary of Random Forest model training:")
+    print(f"Successfully trained models: {len(success)}/{len(results)}")
+    print(f"Failed models: {sum(1 for r in results if r.get('status') == 'error')}/{len(results)}")
+    print(f"Skipped files: {sum(1 for r in results if r.get('status') == 'skipped')}/{len(results)}")
+
+    summary_path = os.path.join(output_dir, 'cancelled_prob_rf_summary.csv')
+    pd.DataFrame(results).to_csv(summary_path, index=False)
+
+    if success:
+        print("\nAverage metrics across all successful models:")
+        print(f"Accuracy: {np.mean([r['accuracy'] for r in success]):.2f}%")
+        print(f"ROC AUC: {np.mean([r['roc_auc'] for r in success]):.4f}")
+        print(f"Precision: {np.mean([r['precision'] for r in success]):.4f}")
+        print(f"Recall: {np.mean([r['recall'] for r in success]):.4f}")
+    print(f"Full summary saved to {summary_path}")
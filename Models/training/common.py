@@ -0,0 +1,292 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.inspection import permutation_importance
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+import weather_join
+from weather_store import WeatherStore
+
+# Default paths, relative to Models/ as in the notebooks
+FLIGHT_DATA_PATH = './cleaned_data/'
+WEATHER_DATA_PATH = './cleaned_weather_data/'
+WEATHER_STORE_PATH = './weather_store/'
+TOP_AIRPORTS_FILE = './top_100_airports.csv'
+YEARS = [2021, 2022, 2023, 2024]
+
+# 'rf' is the notebooks' random forest, 'hgb' histogram gradient boosting
+ENGINES = ['rf', 'hgb']
+# HistGradientBoosting bins categories into at most 255 bins; rarer
+# categories are grouped into one
+HGB_MAX_CATEGORIES = 250
+# Held-out rows used for permutation importance when a model has no
+# feature_importances_
+IMPORTANCE_MAX_ROWS = 10000
+
+MONTH_MAP = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
+    'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
+    'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
+}
+
+
+def convert_to_serializable(obj):
+    """
+    Convert NumPy types to Python native types for JSON serialization
+    """
+    if isinstance(obj, (np.integer, np.int64, np.int32, np.int16, np.int8)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64, np.float32, np.float16)):
+        return float(obj)
+    elif isinstance(obj, (np.ndarray,)):
+        return obj.tolist()
+    elif isinstance(obj, (pd.DataFrame,)):
+        return obj.to_dict('records')
+    elif isinstance(obj, (pd.Series,)):
+        return obj.to_dict()
+    elif isinstance(obj, dict):
+        return {k: convert_to_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_to_serializable(item) for item in obj]
+    else:
+        return obj
+
+
+def save_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(convert_to_serializable(obj), f, indent=4)
+
+
+def load_top_airports(top_airports_file=TOP_AIRPORTS_FILE, n=30):
+    """
+    IATA codes of the n busiest airports, or None to keep every airport.
+    """
+    try:
+        top_airports = pd.read_csv(top_airports_file, low_memory=False).head(n)
+        top_airport_codes = set(top_airports['ORIGIN_IATA'].str.strip().tolist())
+        print(f"Loaded top {n} airports: {', '.join(sorted(top_airport_codes))}")
+        return top_airport_codes
+    except Exception as e:
+        print(f"Error loading top airports file: {e}")
+        print("Will process all airports (top airports file not available)")
+        return None
+
+
+def load_weather_data(weather_data_path=WEATHER_DATA_PATH, top_airport_codes=None, years=None,
+                      store_path=WEATHER_STORE_PATH):
+    """
+    The notebooks' weather_dict: {'IATA_YYYY_MM': DataFrame}, one mmap per
+    year from the weather store at store_path (see weather_store.py), or
+    from the cleaned IATA_YYYY_Mon*.csv files when there is no store.
+    """
+    print("\nLoading weather data...")
+    start_time = time.time()
+
+    if store_path and os.path.isdir(store_path):
+        store = WeatherStore(store_path)
+        stored_years = store.years()
+        if stored_years:
+            weather_dict = {}
+            for year in (stored_years if years is None else years):
+                if year not in stored_years:
+                    print(f"Warning: {year} is not in the weather store {store_path}")
+                    continue
+                weather_dict.update(store.to_weather_dict(year, top_airport_codes))
+            print(f"Loaded {len(weather_dict)} airport-months from {store_path} "
+                  f"in {time.time() - start_time:.2f} seconds")
+            return weather_dict
+
+    weather_dict = {}
+    for file in glob.glob(os.path.join(weather_data_path, "*.csv")):
+        parts = os.path.basename(file).split('.')[0].split('_')
+        if len(parts) < 3 or parts[2] not in MONTH_MAP:
+            continue
+        iata, year, month = parts[0], parts[1], MONTH_MAP[parts[2]]
+        if top_airport_codes is not None and iata not in top_airport_codes:
+            continue
+        if years is not None and int(year) not in years:
+            continue
+        try:
+            weather_data = pd.read_csv(file, low_memory=False)
+        except Exception as e:
+            print(f"Error loading weather file {file}: {e}")
+            continue
+        if 'DATE' not in weather_data.columns:
+            print(f"Warning: DATE column not found in {os.path.basename(file)}")
+            continue
+        weather_data['DATE'] = pd.to_datetime(weather_data['DATE'])
+        weather_dict[f"{iata}_{year}_{month}"] = weather_data
+
+    print(f"Loaded {len(weather_dict)} weather files in {time.time() - start_time:.2f} seconds")
+    return weather_dict
+
+
+def get_may_files(flight_data_path=FLIGHT_DATA_PATH, years=YEARS):
+    """
+    {year: path} of the MayYYYY.csv files that exist.
+    """
+    files = {}
+    for year in years:
+        file_path = os.path.join(flight_data_path, f"May{year}.csv")
+        if os.path.exists(file_path):
+            files[year] = file_path
+        else:
+            print(f"Warning: File {file_path} not found")
+    return files
+
+
+def extract_year_from_filename(filename):
+    base_name = os.path.basename(filename)
+    year_str = base_name.replace('May', '').split('.')[0]
+    return int(year_str)
+
+
+def read_may_flights(file_path, top_airport_codes=None, filter_year=True):
+    """
+    Read one MayYYYY.csv, keep May rows (and only the file's year, if the
+    file holds several) and flights between top airports.
+    """
+    df = pd.read_csv(file_path, low_memory=False)
+    original_size = len(df)
+    file_year = extract_year_from_filename(file_path)
+
+    if filter_year:
+        if 'YEAR' in df.columns:
+            if df['YEAR'].nunique() > 1:
+                df = df[df['YEAR'] == file_year]
+        else:
+            df['YEAR'] = file_year
+
+    if 'MONTH' in df.columns and (df['MONTH'] == 5).any():
+        df = df[df['MONTH'] == 5]
+
+    if top_airport_codes is not None:
+        df = df[
+            df['ORIGIN_IATA'].str.strip().isin(top_airport_codes) &
+            df['DEST_IATA'].str.strip().isin(top_airport_codes)
+        ]
+        print(f"Filtered from {original_size} to {len(df)} rows for top {len(top_airport_codes)} airports")
+    return df
+
+
+def match_weather(df, weather, destination=True):
+    """
+    Add origin (and destination) weather columns with weather_join.
+    """
+    df = weather_join.match_weather_data(df, weather)
+    if destination:
+        df = weather_join.match_destination_weather_data(df, weather)
+    return df
+
+
+def fill_missing_features(X, cat_features, num_features):
+    """
+    'unknown' for missing categories, the column median for missing numbers.
+    """
+    for col in cat_features:
+        if X[col].isnull().sum() > 0:
+            if isinstance(X[col].dtype, pd.CategoricalDtype):
+                if 'unknown' not in X[col].cat.categories:
+                    X[col] = X[col].cat.add_categories(['unknown'])
+            X[col] = X[col].fillna('unknown')
+    for col in num_features:
+        if X[col].isnull().sum() > 0:
+            X[col] = X[col].fillna(X[col].median())
+    return X
+
+
+def make_preprocessor(num_features, cat_features):
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())
+    ])
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))
+    ])
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, num_features),
+            ('cat', categorical_transformer, cat_features)
+        ])
+
+
+def make_hgb_preprocessor(num_features, cat_features):
+    """
+    Preprocessor for the 'hgb' engine: numbers pass through (the model bins
+    them and handles NaN itself) and categories become ordinal codes, with
+    -1 (treated as missing) for unseen values. Categories come after the
+    numbers, as categorical_mask assumes.
+    """
+    return ColumnTransformer(
+        transformers=[
+            ('num', 'passthrough', num_features),
+            ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+                                   encoded_missing_value=-1, max_categories=HGB_MAX_CATEGORIES),
+             cat_features)
+        ])
+
+
+def categorical_mask(num_features, cat_features):
+    """
+    categorical_features for a HistGradientBoosting model behind
+    make_hgb_preprocessor.
+    """
+    return [False] * len(num_features) + [True] * len(cat_features)
+
+
+def preprocessor_for(engine):
+    return make_hgb_preprocessor if engine == 'hgb' else make_preprocessor
+
+
+def feature_importance(model, step, X_test=None, y_test=None):
+    """
+    Feature/Importance frame of a fitted pipeline's tree model, most
+    important first. Models without feature_importances_ (gradient
+    boosting) get permutation importance on up to IMPORTANCE_MAX_ROWS rows
+    of the transformed test matrix X_test.
+    """
+    feature_names = model.named_steps['preprocessor'].get_feature_names_out()
+    estimator = model.named_steps[step]
+    if hasattr(estimator, 'feature_importances_'):
+        importances = estimator.feature_importances_
+    else:
+        importances = permutation_importance(
+            estimator, X_test, y_test, n_repeats=3, random_state=2025,
+            max_samples=min(len(y_test), IMPORTANCE_MAX_ROWS)
+        ).importances_mean
+    importance_df = pd.DataFrame({
+        'Feature': feature_names,
+        'Importance': importances
+    })
+    return importance_df.sort_values('Importance', ascending=False)
+
+
+def add_top_features(metrics, importance_df, prefix, n=10):
+    for i in range(min(n, len(importance_df))):
+        feat = importance_df.iloc[i]
+        metrics[f'{prefix}top_feature_{i+1}'] = feat['Feature']
+        metrics[f'{prefix}top_feature_{i+1}_importance'] = float(feat['Importance'])
+
+
+def top_features_by_year(results, prefix, n):
+    """
+    {year: [{'feature', 'importance'}, ...]} from the top-feature metrics.
+    """
+    by_year = {}
+    for r in results:
+        features = []
+        for i in range(1, n + 1):
+            feat_key = f'{prefix}top_feature_{i}'
+            imp_key = f'{prefix}top_feature_{i}_importance'
+            if feat_key in r and imp_key in r:
+                features.append({'feature': r[feat_key], 'importance': r[imp_key]})
+        by_year[r['year']] = features
+    return by_year
@@ -0,0 +1,373 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.ensemble import (HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.metrics import (classification_report, mean_absolute_error,
+                             mean_squared_error, r2_score, roc_auc_score)
+
+from . import common, feature_cache
+
+OUTPUT_DIR = './dep_delay_rf/'
+
+CAT_FEATURES = ['DAY_NAME', 'TIME_BLOCK', 'MKT_AIRLINE', 'ORIGIN_IATA', 'DEST_IATA',
+                'IS_REDEYE', 'IS_WEEKEND', 'IS_MORNING_PEAK', 'IS_EVENING_PEAK', 'EXTREME_WEATHER']
+NUM_FEATURES = ['DISTANCE', 'PRCP']
+
+TIME_BLOCKS = {
+    0: 'Late Night (0-3)', 1: 'Late Night (0-3)', 2: 'Late Night (0-3)',
+    3: 'Early Morning (3-6)', 4: 'Early Morning (3-6)', 5: 'Early Morning (3-6)',
+    6: 'Morning (6-9)', 7: 'Morning (6-9)', 8: 'Morning (6-9)',
+    9: 'Mid-Day (9-12)', 10: 'Mid-Day (9-12)', 11: 'Mid-Day (9-12)',
+    12: 'Afternoon (12-15)', 13: 'Afternoon (12-15)', 14: 'Afternoon (12-15)',
+    15: 'Evening (15-18)', 16: 'Evening (15-18)', 17: 'Evening (15-18)',
+    18: 'Night (18-21)', 19: 'Night (18-21)', 20: 'Night (18-21)',
+    21: 'Late Night (21-24)', 22: 'Late Night (21-24)', 23: 'Late Night (21-24)'
+}
+
+DAY_NAMES = {
+    'Sun': 'Sunday', 'Mon': 'Monday', 'Tue': 'Tuesday', 'Wed': 'Wednesday',
+    'Thu': 'Thursday', 'Fri': 'Friday', 'Sat': 'Saturday'
+}
+
+
+def create_redeye_indicator(df):
+    """
+    IS_REDEYE for flights scheduled to depart or arrive between 0 and 6 AM,
+    plus DEP_TIME_OF_DAY.
+    """
+    df = df.copy()
+    df['IS_REDEYE'] = 0
+
+    for col in ['SCH_DEP_TIME', 'SCH_ARR_TIME']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+            df.loc[(df[col] >= 0) & (df[col] < 600), 'IS_REDEYE'] = 1
+
+    redeye_count = df['IS_REDEYE'].sum()
+    print(f"Total identified red-eye flights: {redeye_count} out of {len(df)} total flights "
+          f"({redeye_count/len(df)*100:.2f}%)")
+
+    if 'SCH_DEP_TIME' in df.columns:
+        df['DEP_TIME_OF_DAY'] = pd.cut(
+            df['SCH_DEP_TIME'],
+            bins=[0, 600, 1200, 1800, 2400],
+            labels=['Early Morning (0-6)', 'Morning (6-12)', 'Afternoon (12-18)', 'Evening (18-24)'],
+            include_lowest=True
+        )
+    return df
+
+
+def prepare_delay_data(df):
+    df = df.copy()
+    df['DEP_DELAY'] = pd.to_numeric(df['DEP_DELAY'], errors='coerce')
+
+    df['IS_DELAYED'] = (df['DEP_DELAY'] > 0).astype(int)
+    df['DELAY_CATEGORY'] = pd.cut(
+        df['DEP_DELAY'],
+        bins=[-float('inf'), -15, 0, 15, 60, 120, float('inf')],
+        labels=['Very Early', 'Early', 'On Time', 'Moderate Delay',
+                'Significant Delay', 'Severe Delay'],
+        include_lowest=True
+    )
+    df['ABS_DELAY'] = np.abs(df['DEP_DELAY'])
+
+    delay_count = df['IS_DELAYED'].sum()
+    print(f"Delayed flights: {delay_count}/{len(df)} ({delay_count/len(df)*100:.2f}%)")
+    print(f"Mean delay: {df['DEP_DELAY'].mean():.2f} minutes")
+    return df
+
+
+def create_time_block_features(df):
+    df = df.copy()
+    if 'SCH_DEP_TIME' not in df.columns:
+        print("Warning: SCH_DEP_TIME column not found for time block features")
+        return df
+
+    df['SCH_DEP_TIME'] = pd.to_numeric(df['SCH_DEP_TIME'], errors='coerce')
+    df['DEP_HOUR'] = (df['SCH_DEP_TIME'] / 100).astype(int)
+    df['TIME_BLOCK'] = df['DEP_HOUR'].map(TIME_BLOCKS)
+    df['IS_MORNING_PEAK'] = ((df['DEP_HOUR'] >= 7) & (df['DEP_HOUR'] <= 9)).astype(int)
+    df['IS_EVENING_PEAK'] = ((df['DEP_HOUR'] >= 16) & (df['DEP_HOUR'] <= 19)).astype(int)
+    return df
+
+
+def create_day_features(df):
+    df = df.copy()
+    if 'WEEK' in df.columns:
+        df['DAY_NAME'] = df['WEEK'].map(DAY_NAMES)
+        df['IS_WEEKEND'] = df['WEEK'].isin(['Sat', 'Sun']).astype(int)
+    elif 'DAY_OF_WEEK' in df.columns:
+        if df['DAY_OF_WEEK'].max() == 7:
+            df['IS_WEEKEND'] = df['DAY_OF_WEEK'].isin([6, 7]).astype(int)
+            day_names = {1: 'Monday', 2: 'Tuesday', 3: 'Wednesday',
+                         4: 'Thursday', 5: 'Friday', 6: 'Saturday', 7: 'Sunday'}
+        else:
+            df['IS_WEEKEND'] = df['DAY_OF_WEEK'].isin([5, 6]).astype(int)
+            day_names = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday',
+                         3: 'Thursday', 4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
+        df['DAY_NAME'] = df['DAY_OF_WEEK'].map(day_names)
+    else:
+        print("Warning: No day of week column (WEEK or DAY_OF_WEEK) found")
+    return df
+
+
+def load_and_process_flight_data(file_path, top_airport_codes=None):
+    print(f"\nProcessing {os.path.basename(file_path)}...")
+    df = common.read_may_flights(file_path, top_airport_codes)
+
+    if 'DEP_DELAY' not in df.columns:
+        print(f"DEP_DELAY column not found in {os.path.basename(file_path)}. Skipping file.")
+        return None
+    if len(df) == 0:
+        return None
+
+    if 'CANCELLED' in df.columns:
+        df = df[df['CANCELLED'] == 0]
+    return df
+
+
+def build_feature_frame(flight_data_file, weather, top_airport_codes=None):
+    """
+    Load one year's flights, join origin weather and add the engineered
+    features (the cacheable part of train_year_model).
+    """
+    flight_data = load_and_process_flight_data(flight_data_file, top_airport_codes)
+    if flight_data is None or len(flight_data) == 0:
+        return None
+
+    flight_data = common.match_weather(flight_data, weather, destination=False)
+    flight_data = create_redeye_indicator(flight_data)
+    flight_data = prepare_delay_data(flight_data)
+    flight_data = create_time_block_features(flight_data)
+    flight_data = create_day_features(flight_data)
+    return flight_data
+
+
+def make_models(engine, num_features, cat_features, n_jobs=-1):
+    """
+    (classifier, regressor) for an engine: the notebook's forests for 'rf',
+    histogram gradient boosting with native categories for 'hgb' (threads
+    come from OpenMP, capped by the runner).
+    """
+    if engine == 'hgb':
+        categorical = common.categorical_mask(num_features, cat_features)
+        return (
+            HistGradientBoostingClassifier(
+                max_iter=300,
+                learning_rate=0.1,
+                max_leaf_nodes=63,
+                min_samples_leaf=20,
+                class_weight='balanced',
+                categorical_features=categorical,
+                random_state=2025
+            ),
+            HistGradientBoostingRegressor(
+                max_iter=300,
+                learning_rate=0.1,
+                max_leaf_nodes=63,
+                min_samples_leaf=20,
+                categorical_features=categorical,
+                random_state=2025
+            ))
+    return (
+        RandomForestClassifier(
+            n_estimators=200,
+            max_depth=20,
+            min_samples_split=10,
+            min_samples_leaf=5,
+            class_weight='balanced',
+            random_state=2025,
+            n_jobs=n_jobs
+        ),
+        RandomForestRegressor(
+            n_estimators=200,
+            max_depth=20,
+            min_samples_split=10,
+            min_samples_leaf=5,
+            random_state=2025,
+            n_jobs=n_jobs
+        ))
+
+
+def train_year_model(year, flight_data_file, weather, top_airport_codes=None,
+                     output_dir=OUTPUT_DIR, n_jobs=-1, cache=None, engine='rf'):
+    """
+    Port of dep_delay_rf.ipynb's train_year_model: fits the delay classifier
+    and regressor for one year and writes the models, feature importances
+    and model_metrics_{year}.json under output_dir/year_{year}/. With a
+    FeatureCache, features and design matrices are reused across runs.
+    engine='hgb' swaps the forests for gradient boosting, same artifacts.
+    """
+    print(f"\nTraining {engine} model for year {year}")
+
+    year_output_dir = os.path.join(output_dir, f'year_{year}')
+    os.makedirs(os.path.join(year_output_dir, 'metrics'), exist_ok=True)
+    start_time = time.time()
+
+    flight_data, key = feature_cache.feature_frame(
+        cache, build_feature_frame, year, 5, flight_data_file, weather, top_airport_codes)
+    if flight_data is None or len(flight_data) == 0:
+        print(f"No valid flight data available for {year}. Skipping this year.")
+        return None
+
+    cat_features = [f for f in CAT_FEATURES if f in flight_data.columns]
+    num_features = [f for f in NUM_FEATURES if f in flight_data.columns]
+
+    X = common.fill_missing_features(flight_data[cat_features + num_features].copy(),
+                                     cat_features, num_features)
+    y_class = flight_data['IS_DELAYED']
+    y_reg = flight_data['DEP_DELAY']
+
+    make_preprocessor = common.preprocessor_for(engine)
+    Xt_class, class_preprocessor, train_class, test_class = feature_cache.design_matrix(
+        cache, key, X, y_class, num_features, cat_features, make_preprocessor,
+        test_size=0.1, random_state=2025, stratify=True)
+    Xt_reg, reg_preprocessor, train_reg, test_reg = feature_cache.design_matrix(
+        cache, key, X, y_reg, num_features, cat_features, make_preprocessor,
+        test_size=0.1, random_state=2025, stratify=False)
+    y_test_class = y_class.iloc[test_class]
+    y_test_reg = y_reg.iloc[test_reg]
+
+    classifier, regressor = make_models(engine, num_features, cat_features, n_jobs)
+
+    class_model_start_time = time.time()
+    class_model = feature_cache.fit_estimator(
+        'classifier', classifier, Xt_class, class_preprocessor, y_class, train_class)
+    class_model_training_time = time.time() - class_model_start_time
+    print(f"[{year}] Classification model training took: {class_model_training_time:.2f} seconds")
+
+    reg_model_start_time = time.time()
+    reg_model = feature_cache.fit_estimator(
+        'regressor', regressor, Xt_reg, reg_preprocessor, y_reg, train_reg)
+    reg_model_training_time = time.time() - reg_model_start_time
+    print(f"[{year}] Regression model training took: {reg_model_training_time:.2f} seconds")
+
+    classifier = class_model.named_steps['classifier']
+    y_pred_class = classifier.predict(Xt_class[test_class])
+    y_prob_class = classifier.predict_proba(Xt_class[test_class])[:, 1]
+    class_accuracy = (y_pred_class == y_test_class).mean() * 100
+    class_roc_auc = roc_auc_score(y_test_class, y_prob_class)
+    class_report = classification_report(y_test_class, y_pred_class, output_dict=True)
+
+    y_pred_reg = reg_model.named_steps['regressor'].predict(Xt_reg[test_reg])
+    reg_mse = mean_squared_error(y_test_reg, y_pred_reg)
+    reg_rmse = np.sqrt(reg_mse)
+    reg_mae = mean_absolute_error(y_test_reg, y_pred_reg)
+    reg_r2 = r2_score(y_test_reg, y_pred_reg)
+    print(f"[{year}] Classification AUC: {class_roc_auc:.4f}, regression RMSE: {reg_rmse:.2f} minutes")
+
+    class_importance_df = common.feature_importance(class_model, 'classifier',
+                                                    Xt_class[test_class], y_test_class)
+    class_importance_df.to_csv(
+        os.path.join(year_output_dir, 'metrics', f"rf_class_feature_importance_{year}.csv"), index=False)
+    reg_importance_df = common.feature_importance(reg_model, 'regressor',
+                                                  Xt_reg[test_reg], y_test_reg)
+    reg_importance_df.to_csv(
+        os.path.join(year_output_dir, 'metrics', f"rf_reg_feature_importance_{year}.csv"), index=False)
+
+    redeye_delay = flight_data[flight_data['IS_REDEYE'] == 1]['DEP_DELAY'].mean()
+    non_redeye_delay = flight_data[flight_data['IS_REDEYE'] == 0]['DEP_DELAY'].mean()
+    redeye_count = (flight_data['IS_REDEYE'] == 1).sum()
+
+    dump(class_model, os.path.join(year_output_dir, f"rf_class_model_{year}.joblib"))
+    dump(reg_model, os.path.join(year_output_dir, f"rf_reg_model_{year}.joblib"))
+    print(f"Models saved to {year_output_dir}")
+
+    metrics = {
+        'model_name': f'random_forest_{year}' if engine == 'rf' else f'{engine}_{year}',
+        'engine': engine,
+        'year': year,
+        'total_flights': len(flight_data),
+        'delayed_flights_rate': flight_data['IS_DELAYED'].mean() * 100,
+        'mean_delay': flight_data['DEP_DELAY'].mean(),
+        'median_delay': flight_data['DEP_DELAY'].median(),
+        'max_delay': flight_data['DEP_DELAY'].max(),
+        'min_delay': flight_data['DEP_DELAY'].min(),
+        'class_accuracy': class_accuracy,
+        'class_roc_auc': class_roc_auc,
+        'class_precision': class_report['1']['precision'],
+        'class_recall': class_report['1']['recall'],
+        'class_f1': class_report['1']['f1-score'],
+        'class_training_time': class_model_training_time,
+        'reg_mse': reg_mse,
+        'reg_rmse': reg_rmse,
+        'reg_mae': reg_mae,
+        'reg_r2': reg_r2,
+        'reg_training_time': reg_model_training_time,
+        'redeye_count': redeye_count,
+        'redeye_percentage': redeye_count / len(flight_data) * 100,
+        'redeye_mean_delay': redeye_delay,
+        'non_redeye_mean_delay': non_redeye_delay,
+        'status': 'success',
+        'total_processing_time': time.time() - start_time
+    }
+    common.add_top_features(metrics, class_importance_df, 'class_')
+    common.add_top_features(metrics, reg_importance_df, 'reg_')
+
+    feature_names = class_model.named_steps['preprocessor'].get_feature_names_out()
+    week_features = [f for f in feature_names if 'WEEK' in f]
+    if week_features:
+        metrics['week_features'] = week_features
+        metrics['week_importance_class'] = class_importance_df[
+            class_importance_df['Feature'].isin(week_features)].to_dict('records')
+        metrics['week_importance_reg'] = reg_importance_df[
+            reg_importance_df['Feature'].isin(week_features)].to_dict('records')
+
+    common.save_json(metrics, os.path.join(year_output_dir, 'metrics', f'model_metrics_{year}.json'))
+    print(f"\n{engine} model training for {year} complete! "
+          f"Total processing time: {metrics['total_processing_time']:.2f} seconds")
+    return metrics
+
+
+def compare_year_models(all_results, output_dir=OUTPUT_DIR):
+    """
+    The notebook's comparison tables (figures stay in the notebook).
+    """
+    print("\nComparing models across years...")
+    if not all_results or len(all_results) < 2:
+        print("Not enough year models to compare.")
+        return
+
+    comparison_dir = os.path.join(output_dir, 'comparison')
+    os.makedirs(comparison_dir, exist_ok=True)
+    years = sorted([r['year'] for r in all_results])
+
+    class_metrics = pd.DataFrame({
+        'Year': years,
+        'Accuracy (%)': [r['class_accuracy'] for r in all_results],
+        'AUC': [r['class_roc_auc'] for r in all_results],
+        'Precision': [r['class_precision'] for r in all_results],
+        'Recall': [r['class_recall'] for r in all_results],
+        'F1 Score': [r['class_f1'] for r in all_results],
+    })
+    reg_metrics = pd.DataFrame({
+        'Year': years,
+        'RMSE (min)': [r['reg_rmse'] for r in all_results],
+        'MAE (min)': [r['reg_mae'] for r in all_results],
+        'R² Score': [r['reg_r2'] for r in all_results],
+    })
+    delay_stats = pd.DataFrame({
+        'Year': years,
+        'Mean Delay (min)': [r['mean_delay'] for r in all_results],
+        'Delay Rate (%)': [r['delayed_flights_rate'] for r in all_results],
+        'Total Flights': [r['total_flights'] for r in all_results],
+    })
+
+    summary = pd.concat([
+        delay_stats.set_index('Year'),
+        class_metrics.set_index('Year').iloc[:, 1:],
+        reg_metrics.set_index('Year').iloc[:, 1:]
+    ], axis=1)
+    summary.to_csv(os.path.join(comparison_dir, 'dep_delay_rf_summary.csv'))
+    print(f"Comparison summary saved to {os.path.join(comparison_dir, 'dep_delay_rf_summary.csv')}")
+
+    feature_comparison = {
+        'classification': common.top_features_by_year(all_results, 'class_', 10),
+        'regression': common.top_features_by_year(all_results, 'reg_', 10)
+    }
+    common.save_json(feature_comparison, os.path.join(comparison_dir, 'feature_importance_comparison.json'))
+    print("Year model comparison completed!")
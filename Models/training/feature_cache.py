@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import dump, load
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+# Default cache location, relative to Models/ like the other training paths
+FEATURE_CACHE_PATH = './feature_cache/'
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Source files whose contents define the cached features, besides the
+# module that builds the frame
+CODE_FILES = [os.path.join(HERE, 'common.py'),
+              os.path.join(os.path.dirname(HERE), 'weather_join.py')]
+
+
+def spec_hash(spec):
+    """
+    Short, stable hash of a JSON-able spec dict.
+    """
+    payload = json.dumps(spec, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def code_version(module_file):
+    """
+    Hash of the feature code, so a code change invalidates old entries.
+    """
+    digest = hashlib.sha256()
+    for path in CODE_FILES + [module_file]:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def frame_hash(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def frame_spec(build, year, month, file_path, weather, top_airport_codes):
+    """
+    Everything the engineered frame depends on: the feature builder and its
+    source, the flight file (by size and mtime), the weather table and the
+    airport filter.
+    """
+    module = __import__(build.__module__, fromlist=['_'])
+    stat = os.stat(file_path)
+    return {
+        'builder': f'{build.__module__}.{build.__qualname__}',
+        'code_version': code_version(module.__file__),
+        'year': year,
+        'month': month,
+        'source': os.path.abspath(file_path),
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+        'weather_hash': frame_hash(weather),
+        'top_airports': sorted(top_airport_codes) if top_airport_codes is not None else None,
+    }
+
+
+def matrix_spec(target, num_features, cat_features, preprocessor, test_size, random_state, stratify):
+    return {
+        'target': target,
+        'num_features': list(num_features),
+        'cat_features': list(cat_features),
+        'preprocessor': repr(preprocessor),
+        'test_size': test_size,
+        'random_state': random_state,
+        'stratify': stratify,
+    }
+
+
+def _write_atomic(final_dir, write):
+    """
+    Build an entry in a temporary directory and rename it into place; if
+    another process got there first, keep theirs.
+    """
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    write(tmp_dir)
+    try:
+        os.replace(tmp_dir, final_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class FeatureCache:
+    """
+    Engineered feature frames and transformed design matrices keyed by
+    (year, month, spec hash). Columns and matrices are stored as .npy files
+    and opened with np.load(mmap_mode='r'), so a cache hit skips reading
+    CSVs, the weather join, feature engineering and the preprocessor fit.
+    """
+
+    def __init__(self, path=FEATURE_CACHE_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def entry_dir(self, key):
+        year, month, digest = key
+        return os.path.join(self.path, f"{year}_{month:02d}_{digest}")
+
+    def has_frame(self, key):
+        return os.path.exists(os.path.join(self.entry_dir(key), 'frame.json'))
+
+    def save_frame(self, key, df, spec=None):
+        """
+        Store each column as its own .npy: numeric, bool and datetime columns
+        as-is, categorical and object columns as int32 codes plus categories.
+        """
+        def write(tmp_dir):
+            columns = []
+            for i, col in enumerate(df.columns):
+                values = df[col]
+                entry = {'name': col, 'file': f'col_{i}.npy'}
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    entry.update(kind='category', ordered=bool(values.cat.ordered))
+                    codes, categories = values.cat.codes.to_numpy(), values.cat.categories.to_numpy()
+                elif isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+                    entry['kind'] = 'array'
+                    np.save(os.path.join(tmp_dir, entry['file']), values.to_numpy())
+                    columns.append(entry)
+                    continue
+                else:
+                    entry['kind'] = 'object'
+                    codes, categories = pd.factorize(values, use_na_sentinel=True)
+                np.save(os.path.join(tmp_dir, entry['file']), codes.astype(np.int32))
+                np.save(os.path.join(tmp_dir, f'col_{i}.categories.npy'),
+                        np.asarray(categories, dtype=object), allow_pickle=True)
+                columns.append(entry)
+
+            np.save(os.path.join(tmp_dir, 'index.npy'), df.index.to_numpy())
+            with open(os.path.join(tmp_dir, 'frame.json'), 'w') as f:
+                json.dump({'key': list(key), 'rows': len(df), 'columns': columns, 'spec': spec},
+                          f, indent=4, default=str)
+
+        _write_atomic(self.entry_dir(key), write)
+
+    def load_frame(self, key):
+        entry_dir = self.entry_dir(key)
+        with open(os.path.join(entry_dir, 'frame.json')) as f:
+            meta = json.load(f)
+
+        data = {}
+        for entry in meta['columns']:
+            values = np.load(os.path.join(entry_dir, entry['file']), mmap_mode='r')
+            if entry['kind'] == 'array':
+                data[entry['name']] = values
+                continue
+            categories = np.load(os.path.join(entry_dir, entry['file'].replace('.npy', '.categories.npy')),
+                                 allow_pickle=True)
+            if entry['kind'] == 'category':
+                data[entry['name']] = pd.Categorical.from_codes(values, pd.Index(categories),
+                                                                ordered=entry['ordered'])
+            else:
+                # code -1 (missing) picks the trailing NaN
+                lookup = np.append(np.asarray(categories, dtype=object), np.array([np.nan], dtype=object))
+                data[entry['name']] = lookup[values]
+        index = pd.Index(np.load(os.path.join(entry_dir, 'index.npy'), allow_pickle=True))
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def matrix_dir(self, key, digest):
+        return os.path.join(self.entry_dir(key), f"matrix_{digest}")
+
+    def has_matrix(self, key, digest):
+        return os.path.exists(os.path.join(self.matrix_dir(key, digest), 'matrix.json'))
+
+    def save_matrix(self, key, digest, X, preprocessor, train_index, test_index, spec=None):
+        """
+        Store a transformed design matrix (dense, or CSR as data/indices/indptr)
+        with its fitted preprocessor and the train/test row positions.
+        """
+        def write(tmp_dir):
+            if sp.issparse(X):
+                csr = X.tocsr()
+                for part in ['data', 'indices', 'indptr']:
+                    np.save(os.path.join(tmp_dir, f'{part}.npy'), getattr(csr, part))
+            else:
+                np.save(os.path.join(tmp_dir, 'X.npy'), np.asarray(X))
+            np.save(os.path.join(tmp_dir, 'train.npy'), np.asarray(train_index))
+            np.save(os.path.join(tmp_dir, 'test.npy'), np.asarray(test_index))
+            dump(preprocessor, os.path.join(tmp_dir, 'preprocessor.joblib'))
+            with open(os.path.join(tmp_dir, 'matrix.json'), 'w') as f:
+                json.dump({'sparse': sp.issparse(X), 'shape': list(X.shape), 'spec': spec},
+                          f, indent=4, default=str)
+
+        os.makedirs(self.entry_dir(key), exist_ok=True)
+        _write_atomic(self.matrix_dir(key, digest), write)
+
+    def load_matrix(self, key, digest):
+        """
+        (X, preprocessor, train_index, test_index) with X memory-mapped.
+        """
+        matrix_dir = self.matrix_dir(key, digest)
+        with open(os.path.join(matrix_dir, 'matrix.json')) as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(matrix_dir, f'{name}.npy'), mmap_mode='r')
+
+        if meta['sparse']:
+            X = sp.csr_matrix((array('data'), array('indices'), array('indptr')), shape=tuple(meta['shape']))
+        else:
+            X = array('X')
+        preprocessor = load(os.path.join(matrix_dir, 'preprocessor.joblib'))
+        return X, preprocessor, np.asarray(array('train')), np.asarray(array('test'))
+
+
+def feature_frame(cache, build, year, month, file_path, weather, top_airport_codes=None):
+    """
+    build(file_path, weather, top_airport_codes) through the cache. Returns
+    (frame, key); key is None when the cache is off or build found no data.
+    """
+    if cache is None:
+        return build(file_path, weather, top_airport_codes), None
+
+    spec = frame_spec(build, year, month, file_path, weather, top_airport_codes)
+    key = (year, month, spec_hash(spec))
+    if cache.has_frame(key):
+        print(f"Loaded cached features for {os.path.basename(file_path)} ({key[2]})")
+        return cache.load_frame(key), key
+
+    df = build(file_path, weather, top_airport_codes)
+    if df is None or len(df) == 0:
+        return df, None
+    cache.save_frame(key, df, spec)
+    return df, key
+
+
+def design_matrix(cache, key, X, y, num_features, cat_features, make_preprocessor,
+                  test_size, random_state=2025, stratify=True):
+    """
+    Split X like train_test_split(X, y, ...), fit the preprocessor on the
+    training rows and transform every row. Returns (Xt, preprocessor,
+    train_index, test_index) with positional indices into X, cached under
+    the frame's key when there is one.
+    """
+    preprocessor = make_preprocessor(num_features, cat_features)
+    spec = matrix_spec(y.name, num_features, cat_features, preprocessor,
+                       test_size, random_state, stratify)
+    digest = spec_hash(spec)
+    if cache is not None and key is not None and cache.has_matrix(key, digest):
+        return cache.load_matrix(key, digest)
+
+    train_index, test_index = train_test_split(
+        np.arange(len(X)), test_size=test_size, random_state=random_state,
+        stratify=y if stratify else None
+    )
+    preprocessor.fit(X.iloc[train_index])
+    Xt = preprocessor.transform(X)
+
+    if cache is not None and key is not None:
+        cache.save_matrix(key, digest, Xt, preprocessor, train_index, test_index, spec)
+    return Xt, preprocessor, train_index, test_index
+
+
+def fit_estimator(step, estimator, Xt, preprocessor, y, train_index):
+    """
+    Fit estimator on the training rows of a design matrix and wrap it with
+    its fitted preprocessor, giving the same Pipeline the notebooks fit on
+    the raw feature frame.
+    """
+    estimator.fit(Xt[train_index], y.iloc[train_index])
+    return Pipeline(steps=[('preprocessor', preprocessor), (step, estimator)])
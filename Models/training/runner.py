@@ -0,0 +1,216 @@
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from threadpoolctl import threadpool_limits
+
+import weather_join
+
+from . import arr_rf, cancelled_prob_rf, common, dep_delay_rf, feature_cache
+
+FAMILIES = {
+    'dep_delay_rf': dep_delay_rf,
+    'arr_rf': arr_rf,
+    'cancelled_prob_rf': cancelled_prob_rf,
+}
+
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+# Set once per worker process by init_worker
+_weather = None
+_top_airport_codes = None
+_threads = None
+_cache = None
+
+
+def thread_budget(n_jobs, workers=None, threads_per_job=None):
+    """
+    Split the machine between concurrent jobs: (worker processes, threads
+    per job). Each job's forest gets n_jobs=threads instead of -1 (gradient
+    boosting gets an OpenMP limit of threads), so workers * threads never
+    exceeds the CPU count unless asked to.
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(n_jobs, workers or cpu_count))
+    if threads_per_job is None:
+        threads_per_job = max(1, cpu_count // workers)
+    return workers, threads_per_job
+
+
+@contextlib.contextmanager
+def thread_env(threads):
+    """
+    Set THREAD_ENV_VARS to threads for processes spawned inside the block
+    and restore the caller's values afterwards.
+    """
+    saved = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def init_worker(weather, top_airport_codes, threads, cache_dir):
+    global _weather, _top_airport_codes, _threads, _cache
+    _weather = weather
+    _top_airport_codes = top_airport_codes
+    _threads = threads
+    _cache = feature_cache.FeatureCache(cache_dir) if cache_dir else None
+    # BLAS/OpenMP pools were sized at import; cap them for this process
+    threadpool_limits(threads)
+
+
+def output_dir_for(family, engine='rf', output_root=None):
+    """
+    Where a family's artifacts go: the notebook's directory (or
+    <output_root>/<family>) for 'rf', with an _<engine> suffix otherwise.
+    """
+    output_dir = os.path.join(output_root, family) if output_root else FAMILIES[family].OUTPUT_DIR
+    if engine == 'rf':
+        return output_dir
+    return output_dir.rstrip('/') + f'_{engine}/'
+
+
+def run_job(family, year, file_path, output_dir, engine='rf', negative_rate=1.0):
+    module = FAMILIES[family]
+    start_time = time.time()
+    if family == 'cancelled_prob_rf':
+        result = module.train_model_for_file(file_path, _weather, _top_airport_codes,
+                                             output_dir, n_jobs=_threads, cache=_cache, engine=engine,
+                                             negative_rate=negative_rate)
+    else:
+        result = module.train_year_model(year, file_path, _weather, _top_airport_codes,
+                                         output_dir, n_jobs=_threads, cache=_cache, engine=engine)
+    return result, time.time() - start_time
+
+
+def summarize(family, results, output_dir):
+    if family == 'cancelled_prob_rf':
+        cancelled_prob_rf.summarize(results, output_dir)
+        return
+    results = [r for r in results if r]
+    if len(results) > 1:
+        FAMILIES[family].compare_year_models(results, output_dir)
+    else:
+        print(f"\n{family}: not enough successful models to perform comparison.")
+
+
+def run(families, years=common.YEARS, flight_data_path=common.FLIGHT_DATA_PATH,
+        weather_data_path=common.WEATHER_DATA_PATH, top_airports_file=common.TOP_AIRPORTS_FILE,
+        output_root=None, workers=None, threads_per_job=None,
+        cache_dir=feature_cache.FEATURE_CACHE_PATH, engine='rf', negative_rate=1.0,
+        weather_store_path=common.WEATHER_STORE_PATH):
+    """
+    Train every (family, year) model in a process pool and write the same
+    artifacts as the notebooks. Feature frames and design matrices are
+    cached under cache_dir (None to disable). engine picks the model
+    ('rf' or 'hgb', see output_dir_for); negative_rate < 1 downsamples
+    non-cancelled flights when training cancellation models. Weather comes
+    from the store at weather_store_path when one exists. Returns
+    {family: [result, ...]} in year order.
+    """
+    flight_files = common.get_may_files(flight_data_path, years)
+    if not flight_files:
+        print("No May files were found. Please check file paths.")
+        return {}
+    jobs = [(family, year) for family in families for year in sorted(flight_files)]
+
+    top_airport_codes = common.load_top_airports(top_airports_file)
+    weather = weather_join.build_weather_table(
+        common.load_weather_data(weather_data_path, top_airport_codes, sorted(flight_files),
+                                 weather_store_path))
+
+    workers, threads = thread_budget(len(jobs), workers, threads_per_job)
+    print(f"\nTraining {len(jobs)} {engine} models with {workers} workers x {threads} threads")
+
+    output_dirs = {family: output_dir_for(family, engine, output_root) for family in families}
+
+    start_time = time.time()
+    results = {family: {} for family in families}
+    context = multiprocessing.get_context('spawn')
+    # Spawned workers read the thread variables before numpy loads its BLAS
+    with thread_env(threads), ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=init_worker,
+            initargs=(weather, top_airport_codes, threads, cache_dir)) as pool:
+        futures = {}
+        for family, year in jobs:
+            future = pool.submit(run_job, family, year, flight_files[year], output_dirs[family],
+                                 engine, negative_rate)
+            futures[future] = (family, year)
+
+        for future in as_completed(futures):
+            family, year = futures[future]
+            try:
+                result, wall_time = future.result()
+            except Exception as e:
+                print(f"Error training {family} for {year}: {e}")
+                result, wall_time = None, 0.0
+                if family == 'cancelled_prob_rf':
+                    result = {'file_name': os.path.basename(flight_files[year]),
+                              'status': 'error', 'reason': str(e)}
+            results[family][year] = result
+            print(f"{family} {year}: {'done' if result else 'failed'} in {wall_time:.2f}s")
+
+    ordered = {family: [by_year[year] for year in sorted(by_year)]
+               for family, by_year in results.items()}
+    for family in families:
+        summarize(family, ordered[family], output_dirs[family])
+
+    print(f"\nTrained {len(jobs)} models in {time.time() - start_time:.2f}s")
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the per-year delay and cancellation models in parallel.")
+    parser.add_argument("families", nargs="+", choices=sorted(FAMILIES),
+                        help="Model families to train")
+    parser.add_argument("--years", type=int, nargs="+", default=common.YEARS)
+    parser.add_argument("--flight-data", default=common.FLIGHT_DATA_PATH)
+    parser.add_argument("--weather-data", default=common.WEATHER_DATA_PATH,
+                        help="Cleaned IATA_YYYY_Mon*.csv files, used when there is no weather store")
+    parser.add_argument("--weather-store", default=common.WEATHER_STORE_PATH,
+                        help="Weather store built by weather_store.py")
+    parser.add_argument("--top-airports", default=common.TOP_AIRPORTS_FILE)
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Write <output-dir>/<family>/ instead of each notebook's directory")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Concurrent training jobs (default: CPU count, at most one per job)")
+    parser.add_argument("--threads-per-job", type=int, default=None,
+                        help="Threads per job (default: CPU count / workers)")
+    parser.add_argument("--engine", choices=common.ENGINES, default='rf',
+                        help="rf: the notebooks' random forests; hgb: histogram gradient boosting "
+                             "(writes <family>_hgb/)")
+    parser.add_argument("--negative-rate", type=float, default=1.0,
+                        help="Fraction of non-cancelled flights the cancellation models train on "
+                             "(probabilities are corrected back to the true rate)")
+    parser.add_argument("--cache-dir", default=feature_cache.FEATURE_CACHE_PATH,
+                        help="Feature-matrix cache directory")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Rebuild features without reading or writing the cache")
+    args = parser.parse_args()
+    if not 0 < args.negative_rate <= 1:
+        parser.error("--negative-rate must be in (0, 1]")
+
+    results = run(list(dict.fromkeys(args.families)), args.years, args.flight_data,
+                  args.weather_data, args.top_airports, args.output_dir,
+                  args.workers, args.threads_per_job,
+                  None if args.no_cache else args.cache_dir, args.engine,
+                  args.negative_rate, args.weather_store)
+    if not results or any(not r or r.get('status') == 'error'
+                          for family_results in results.values() for r in family_results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+
+
+def correct_probability(q, negative_rate):
+    """
+    Undo negative downsampling: a model fitted with negatives kept at rate
+    w has odds 1/w times the full-data odds, so p = w*q / (w*q + 1 - q).
+    """
+    q = np.asarray(q, dtype=float)
+    return negative_rate * q / (negative_rate * q + 1 - q)
+
+
+class NegativeDownsampledClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Binary classifier fitted on every positive row and a negative_rate
+    sample of the negatives. predict_proba is corrected back to the full
+    data's base rate, so the saved pipeline is a drop-in for one fitted on
+    every row. negative_rate=1 fits on everything.
+    """
+
+    def __init__(self, estimator, negative_rate=1.0, random_state=2025):
+        self.estimator = estimator
+        self.negative_rate = negative_rate
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        keep = y == 1
+        if self.negative_rate < 1:
+            keep |= np.random.default_rng(self.random_state).random(len(y)) < self.negative_rate
+        else:
+            keep[:] = True
+        rows = np.flatnonzero(keep)
+        self.estimator_ = clone(self.estimator).fit(X[rows], y[rows])
+        self.classes_ = self.estimator_.classes_
+        self.n_samples_fit_ = len(rows)
+        return self
+
+    def predict_proba(self, X):
+        prob = self.estimator_.predict_proba(X)[:, 1]
+        if self.negative_rate < 1:
+            prob = correct_probability(prob, self.negative_rate)
+        return np.column_stack([1 - prob, prob])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+    @property
+    def feature_importances_(self):
+        return self.estimator_.feature_importances_
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Weather features joined onto each flight (origin as-is, destination as DEST_*)
+WEATHER_COLUMNS = ['EXTREME_WEATHER', 'PRCP', 'WT01', 'WT03', 'WT04', 'WT05', 'WT08', 'WT11']
+
+
+def build_weather_table(weather_dict, columns=WEATHER_COLUMNS):
+    """
+    Flatten the notebooks' weather_dict ({'IATA_YYYY_MM': DataFrame}) into
+    one table with a row per (WEATHER_KEY, DATE). HAS_<col> records whether
+    the source frame had the column at all. Only the first row per key and
+    date is kept, matching the notebooks' `.iloc[0]`.
+    """
+    keys = list(weather_dict.keys())
+    frames = list(weather_dict.values())
+    lengths = [len(frame) for frame in frames]
+
+    table = pd.DataFrame({
+        'WEATHER_KEY': np.repeat(np.array(keys, dtype=object), lengths),
+        'DATE': np.concatenate([pd.to_datetime(frame['DATE']).to_numpy('datetime64[ns]') for frame in frames])
+        if frames else np.array([], dtype='datetime64[ns]')
+    })
+    for col in columns:
+        table[col] = np.concatenate([
+            frame[col].to_numpy(dtype=float) if col in frame.columns else np.full(len(frame), np.nan)
+            for frame in frames]) if frames else np.array([], dtype=float)
+        table[f'HAS_{col}'] = np.repeat([col in frame.columns for frame in frames], lengths).astype(bool)
+    return table.drop_duplicates(['WEATHER_KEY', 'DATE'], keep='first').reset_index(drop=True)
+
+
+def join_weather(df, weather, key_col='WEATHER_KEY', prefix='', columns=WEATHER_COLUMNS):
+    """
+    Copy the weather columns of each flight's (key_col, FLIGHT_DATE) onto
+    df as prefix + column with a single hash lookup per flight. Flights
+    without a match keep their current value (0.0 for new columns).
+    weather is a weather_dict or a table from build_weather_table.
+    Returns the number of matched flights.
+    """
+    table = weather if isinstance(weather, pd.DataFrame) else build_weather_table(weather, columns)
+
+    index = pd.MultiIndex.from_arrays([table['WEATHER_KEY'], table['DATE']])
+    positions = index.get_indexer(pd.MultiIndex.from_arrays([df[key_col], df['FLIGHT_DATE']]))
+    matched = positions >= 0
+
+    for col in columns:
+        target = f'{prefix}{col}'
+        if target not in df.columns:
+            df[target] = 0.0
+        take = matched & table[f'HAS_{col}'].to_numpy()[positions]
+        values = df[target].to_numpy(dtype=float, copy=True)
+        values[take] = table[col].to_numpy()[positions[take]]
+        df[target] = values
+    return int(matched.sum())
+
+
+def _weather_key(df, iata_col):
+    return df[iata_col] + '_' + df['YEAR'].astype(str) + '_' + df['MONTH'].astype(str).str.zfill(2)
+
+
+def match_weather_data(df, weather):
+    """
+    Vectorized replacement for the notebooks' match_weather_data: adds
+    FLIGHT_DATE, WEATHER_KEY and the origin weather columns.
+    """
+    print("\nMatching origin weather data with flights...")
+    start_time = time.time()
+
+    if not all(col in df.columns for col in ['YEAR', 'MONTH', 'DAY']):
+        print("Warning: Missing one or more date columns (YEAR, MONTH, DAY)")
+        print("Weather data cannot be matched")
+        return df
+
+    df['FLIGHT_DATE'] = pd.to_datetime(df[['YEAR', 'MONTH', 'DAY']])
+    df['WEATHER_KEY'] = _weather_key(df, 'ORIGIN_IATA')
+    matched_count = join_weather(df, weather, 'WEATHER_KEY')
+
+    print(f"Matched origin weather data for {matched_count} flights ({matched_count/len(df)*100:.2f}%)")
+    print(f"Origin weather matching took: {time.time() - start_time:.2f} seconds")
+    return df
+
+
+def match_destination_weather_data(df, weather):
+    """
+    Vectorized replacement for the notebooks' match_destination_weather_data:
+    adds DEST_WEATHER_KEY and the DEST_* weather columns.
+    """
+    print("\nMatching destination weather data with flights...")
+    start_time = time.time()
+
+    if not all(col in df.columns for col in ['YEAR', 'MONTH', 'DAY']):
+        print("Warning: Missing one or more date columns (YEAR, MONTH, DAY)")
+        print("Destination weather data cannot be matched")
+        return df
+
+    if 'FLIGHT_DATE' not in df.columns:
+        df['FLIGHT_DATE'] = pd.to_datetime(df[['YEAR', 'MONTH', 'DAY']])
+    df['DEST_WEATHER_KEY'] = _weather_key(df, 'DEST_IATA')
+    matched_count = join_weather(df, weather, 'DEST_WEATHER_KEY', prefix='DEST_')
+
+    print(f"Matched destination weather data for {matched_count} flights ({matched_count/len(df)*100:.2f}%)")
+    print(f"Destination weather matching took: {time.time() - start_time:.2f} seconds")
+    return df
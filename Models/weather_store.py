@@ -0,0 +1,233 @@
+import argparse
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+WT_COLUMNS = [f"WT{i:02d}" for i in range(1, 12)]
+# Flags that make up EXTREME_WEATHER (as in auxiliary.ipynb)
+EXTREME_WEATHER_COLS = ['WT01', 'WT03', 'WT04', 'WT05', 'WT08', 'WT11']
+VALUE_COLUMNS = ['PRCP'] + WT_COLUMNS + ['EXTREME_WEATHER']
+
+RECORD_DTYPE = np.dtype(
+    [('KEY', '<i8'), ('IATA', 'S4'), ('DATE', '<M8[D]'), ('PRCP', '<f4')] +
+    [(col, 'i1') for col in WT_COLUMNS] + [('EXTREME_WEATHER', 'i1')]
+)
+
+FILENAME_PATTERN = re.compile(r'([A-Z0-9]+)_(\d{4})_([A-Za-z]+)_(\d+)\.csv$')
+
+
+def make_keys(iata, dates):
+    """
+    Sortable int64 key for (IATA, date): the IATA code's 4 bytes in the high
+    half, the day number in the low half.
+    """
+    iata = np.ascontiguousarray(iata, dtype='S4')
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    return (iata.view('>u4').astype(np.int64) << 32) | (days + 2 ** 31)
+
+
+def consolidate(files):
+    """
+    Combine raw IATA_YYYY_Mon_N.csv station files into one row per (IATA,
+    date), like auxiliary.ipynb: WT flags are the max over stations (missing
+    = 0), PRCP is the mean of the positive station values (0 if all are zero,
+    NaN if none reported) and EXTREME_WEATHER is the max of the extreme flags.
+    """
+    frames = []
+    for file_path in files:
+        match = FILENAME_PATTERN.search(os.path.basename(file_path))
+        if not match:
+            continue
+        df = pd.read_csv(file_path, usecols=lambda c: c == 'DATE' or c == 'PRCP' or c in WT_COLUMNS)
+        df['IATA'] = match.group(1)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=['IATA', 'DATE'] + VALUE_COLUMNS)
+
+    raw = pd.concat(frames, ignore_index=True)
+    raw['DATE'] = pd.to_datetime(raw['DATE'])
+    for col in WT_COLUMNS:
+        raw[col] = raw[col].fillna(0) if col in raw.columns else 0
+    if 'PRCP' not in raw.columns:
+        raw['PRCP'] = np.nan
+    raw['PRCP_POSITIVE'] = raw['PRCP'].where(raw['PRCP'] > 0)
+
+    grouped = raw.groupby(['IATA', 'DATE'], sort=True)
+    result = grouped[WT_COLUMNS].max().astype(int)
+    positive_mean = grouped['PRCP_POSITIVE'].mean()
+    any_reported = grouped['PRCP'].count() > 0
+    result['PRCP'] = positive_mean.where(positive_mean.notna(), np.where(any_reported, 0.0, np.nan))
+    result['EXTREME_WEATHER'] = result[EXTREME_WEATHER_COLS].max(axis=1)
+    return result.reset_index()[['IATA', 'DATE'] + VALUE_COLUMNS]
+
+
+def to_records(df):
+    """
+    Structured array in RECORD_DTYPE, sorted by (IATA, date).
+    """
+    records = np.zeros(len(df), dtype=RECORD_DTYPE)
+    records['IATA'] = df['IATA'].astype(str).to_numpy().astype('S4')
+    records['DATE'] = pd.to_datetime(df['DATE']).to_numpy().astype('datetime64[D]')
+    records['PRCP'] = df['PRCP'].to_numpy(dtype=float)
+    for col in WT_COLUMNS + ['EXTREME_WEATHER']:
+        records[col] = df[col].fillna(0).to_numpy() if col in df.columns else 0
+    records['KEY'] = make_keys(records['IATA'], records['DATE'])
+    return records[np.argsort(records['KEY'], kind='stable')]
+
+
+def records_to_frame(records):
+    df = pd.DataFrame({name: records[name] for name in RECORD_DTYPE.names if name != 'KEY'})
+    df['IATA'] = df['IATA'].str.decode('ascii')
+    df['DATE'] = df['DATE'].astype('datetime64[ns]')
+    return df
+
+
+class WeatherStore:
+    """
+    Consolidated daily weather keyed by (IATA, date), stored as one sorted
+    .npy structured array per year and opened with np.load(mmap_mode='r'),
+    so loading a year is a single mmap.
+    """
+
+    def __init__(self, path="weather_store"):
+        self.path = path
+        self._years = {}
+        os.makedirs(path, exist_ok=True)
+
+    def year_path(self, year):
+        return os.path.join(self.path, f"weather_{year}.npy")
+
+    def years(self):
+        return sorted(int(m.group(1)) for m in
+                      (re.match(r'weather_(\d{4})\.npy$', f) for f in os.listdir(self.path)) if m)
+
+    def year(self, year):
+        """
+        Memory-mapped records for one year (empty if the year is not stored).
+        """
+        if year not in self._years:
+            path = self.year_path(year)
+            self._years[year] = (np.load(path, mmap_mode='r') if os.path.exists(path)
+                                 else np.zeros(0, dtype=RECORD_DTYPE))
+        return self._years[year]
+
+    def append(self, df):
+        """
+        Upsert consolidated rows (IATA, DATE, PRCP, WT*, EXTREME_WEATHER);
+        rows for an existing (IATA, date) replace the stored ones. Each
+        affected year file is rewritten atomically.
+        """
+        new = to_records(df)
+        years = new['DATE'].astype('datetime64[Y]').astype(int) + 1970
+        for year in np.unique(years).tolist():
+            existing = np.array(self.year(year))
+            combined = np.concatenate([new[years == year], existing])
+            # keep the first occurrence of each key, i.e. the new row
+            _, first = np.unique(combined['KEY'], return_index=True)
+            combined = combined[first]
+
+            tmp_path = self.year_path(year) + ".tmp.npy"
+            np.save(tmp_path, combined)
+            self._years.pop(year, None)
+            os.replace(tmp_path, self.year_path(year))
+        return len(new)
+
+    def ingest_files(self, files):
+        """
+        Consolidate raw IATA_YYYY_Mon_N.csv files and append them.
+        """
+        return self.append(consolidate(files))
+
+    def lookup(self, iata, date):
+        """
+        Weather for one airport-day as a dict, or None.
+        """
+        date = np.datetime64(pd.Timestamp(date).date(), 'D')
+        records = self.year(int(str(date)[:4]))
+        key = make_keys([iata], [date])[0]
+        i = np.searchsorted(records['KEY'], key)
+        if i < len(records) and records['KEY'][i] == key:
+            return {col: records[col][i].item() for col in VALUE_COLUMNS}
+        return None
+
+    def range(self, iata, start_date, end_date):
+        """
+        All stored days for one airport between start_date and end_date (inclusive).
+        """
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        frames = []
+        for year in range(start.year, end.year + 1):
+            records = self.year(year)
+            start_key, end_key = make_keys([iata, iata], [start.date(), end.date()])
+            lo = np.searchsorted(records['KEY'], start_key, side='left')
+            hi = np.searchsorted(records['KEY'], end_key, side='right')
+            frames.append(records_to_frame(records[lo:hi]))
+        return pd.concat(frames, ignore_index=True)
+
+    def lookup_many(self, iata, dates):
+        """
+        Vectorized point lookups: a frame of VALUE_COLUMNS aligned with the
+        inputs, NaN where the airport-day is not stored.
+        """
+        keys = make_keys(np.asarray(iata, dtype=str), pd.to_datetime(dates).to_numpy())
+        years = pd.to_datetime(dates).year.to_numpy()
+        result = pd.DataFrame(np.nan, index=range(len(keys)), columns=VALUE_COLUMNS)
+        for year in np.unique(years).tolist():
+            records = self.year(year)
+            mask = years == year
+            if not len(records):
+                continue
+            position = np.searchsorted(records['KEY'], keys[mask])
+            position = np.minimum(position, len(records) - 1)
+            found = records['KEY'][position] == keys[mask]
+            rows = np.flatnonzero(mask)[found]
+            for col in VALUE_COLUMNS:
+                result.loc[rows, col] = records[col][position[found]]
+        return result
+
+    def to_weather_dict(self, year, airports=None):
+        """
+        The notebooks' weather_dict layout ({'IATA_YYYY_MM': DataFrame}) for one
+        year, optionally only for the given IATA codes.
+        """
+        records = self.year(year)
+        if airports is not None:
+            records = records[np.isin(records['IATA'], np.asarray(sorted(airports), dtype='S4'))]
+        df = records_to_frame(records)
+        keys = df['IATA'] + '_' + df['DATE'].dt.strftime('%Y_%m')
+        return {key: group.drop(columns='IATA').reset_index(drop=True)
+                for key, group in df.groupby(keys)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the consolidated weather store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="ingest raw IATA_YYYY_Mon_N.csv files")
+    build.add_argument("weather_dir", nargs="?", default="weather_data")
+    build.add_argument("-o", "--store", default="weather_store")
+
+    lookup = subparsers.add_parser("lookup", help="print one airport's weather for a date or range")
+    lookup.add_argument("iata")
+    lookup.add_argument("start_date")
+    lookup.add_argument("end_date", nargs="?")
+    lookup.add_argument("-s", "--store", default="weather_store")
+    args = parser.parse_args()
+
+    store = WeatherStore(args.store)
+    if args.command == "build":
+        files = sorted(glob.glob(os.path.join(args.weather_dir, "*.csv")))
+        rows = store.ingest_files(files)
+        print(f"Ingested {len(files)} files into {rows} airport-days; years: {store.years()}")
+    elif args.end_date:
+        print(store.range(args.iata, args.start_date, args.end_date).to_string(index=False))
+    else:
+        print(store.lookup(args.iata, args.start_date))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,75 @@
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-def get_unique_airport_info():
+AIRPORT_COLUMNS = [
+    'ORIGIN_AIRPORT_ID', 'ORIGIN_CITY', 'ORIGIN_IATA',
+    'DEST_AIRPORT_ID', 'DEST_CITY', 'DEST_IATA'
+]
+
+def read_airports(file_path):
+    """
+    Unique airports (AIRPORT_ID, CITY_NAME, IATA_CODE) of one cleaned file,
+    in order of first appearance (origin before destination within a row)
+    """
+    df = pd.read_csv(file_path, usecols=AIRPORT_COLUMNS)
+
+    # Stack origin and destination into one long frame, interleaved by row
+    long_df = pd.DataFrame({
+        'AIRPORT_ID': np.column_stack([df['ORIGIN_AIRPORT_ID'], df['DEST_AIRPORT_ID']]).ravel(),
+        'CITY_NAME': np.column_stack([df['ORIGIN_CITY'], df['DEST_CITY']]).ravel(),
+        'IATA_CODE': np.column_stack([df['ORIGIN_IATA'], df['DEST_IATA']]).ravel()
+    })
+    return long_df.drop_duplicates('AIRPORT_ID')
+
+def get_unique_airport_info(data_dir="cleaned_data", output_csv="airport_id.csv", workers=None):
     # Get all CSV files in the cleaned_data folder
-    data_dir = "cleaned_data"
     csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
-    
-    # Initialize a dictionary to store airport information
-    airport_info = {}
-    
-    # Iterate through each CSV file
-    for file in csv_files:
-        file_path = os.path.join(data_dir, file)
-        try:
-            # Read the CSV file and load required columns
-            df = pd.read_csv(file_path, usecols=[
-                'ORIGIN_AIRPORT_ID', 'ORIGIN_CITY', 'ORIGIN_IATA',
-                'DEST_AIRPORT_ID', 'DEST_CITY', 'DEST_IATA'
-            ])
-            
-            # Process origin and destination airport information
-            for _, row in df.iterrows():
-                origin_id = row['ORIGIN_AIRPORT_ID']
-                if origin_id not in airport_info:
-                    city_state = row['ORIGIN_CITY'].split(', ')
-                    if len(city_state) == 2:
-                        city, state = city_state
-                    else:
-                        city, state = city_state[0], 'Unknown'
-                    
-                    airport_info[origin_id] = {
-                        'state': state,
-                        'city': city,
-                        'iata': row['ORIGIN_IATA']
-                    }
-                
-                dest_id = row['DEST_AIRPORT_ID']
-                if dest_id not in airport_info:
-                    city_state = row['DEST_CITY'].split(', ')
-                    if len(city_state) == 2:
-                        city, state = city_state
-                    else:
-                        city, state = city_state[0], 'Unknown'
-                    
-                    airport_info[dest_id] = {
-                        'state': state,
-                        'city': city,
-                        'iata': row['DEST_IATA']
-                    }
-            
-            print(f"Processed {file}, current unique airports: {len(airport_info)}")
-        except Exception as e:
-            print(f"Error processing {file}: {str(e)}")
-    
-    # Convert the dictionary to a DataFrame
-    result_data = []
-    for airport_id, info in airport_info.items():
-        result_data.append([
-            airport_id,
-            info['state'],
-            info['city'],
-            info['iata']
-        ])
-    
+    file_paths = [os.path.join(data_dir, f) for f in csv_files]
+
+    # Read files in parallel; results come back in file order
+    frames = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(read_airports, path) for path in file_paths]
+        seen = set()
+        for file, future in zip(csv_files, futures):
+            try:
+                frame = future.result()
+            except Exception as e:
+                print(f"Error processing {file}: {str(e)}")
+                continue
+            frames.append(frame)
+            seen.update(frame['AIRPORT_ID'])
+            print(f"Processed {file}, current unique airports: {len(seen)}")
+
+    if frames:
+        airports = pd.concat(frames, ignore_index=True).drop_duplicates('AIRPORT_ID')
+    else:
+        airports = pd.DataFrame(columns=['AIRPORT_ID', 'CITY_NAME', 'IATA_CODE'])
+
+    # Split "City, ST"; anything else keeps its first part as the city
+    parts = airports['CITY_NAME'].astype(str).str.split(', ')
+    airports['CITY'] = parts.str[0]
+    airports['STATE'] = parts.str[1].where(parts.str.len() == 2, 'Unknown')
+
     # Sort by airport ID
-    result_df = pd.DataFrame(result_data, columns=['AIRPORT_ID', 'STATE', 'CITY', 'IATA_CODE'])
+    result_df = airports[['AIRPORT_ID', 'STATE', 'CITY', 'IATA_CODE']]
     result_df = result_df.sort_values('AIRPORT_ID').reset_index(drop=True)
-    
+
     # Save the results to a CSV file
-    result_df.to_csv('airport_id.csv', index=False)
-    
+    result_df.to_csv(output_csv, index=False)
+
     print(f"Total unique airports found: {len(result_df)}")
-    print("Results saved to airport_id.csv")
+    print(f"Results saved to {output_csv}")
+    return result_df
 
 if __name__ == "__main__":
-    get_unique_airport_info()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract unique airports from cleaned flight data.")
+    parser.add_argument("data_dir", nargs="?", default="cleaned_data")
+    parser.add_argument("-o", "--output", default="airport_id.csv")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+    get_unique_airport_info(args.data_dir, args.output, args.workers)
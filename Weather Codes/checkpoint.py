@@ -0,0 +1,65 @@
+import json
+import os
+
+JOURNAL_NAME = ".download_journal.jsonl"
+
+
+def fsync_write(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def write_csv_atomic(df, filepath):
+    """
+    Write df to filepath via a temp file and rename, so a partial CSV never
+    appears under the final name.
+    """
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        df.to_csv(f, index=False)
+        fsync_write(f)
+    os.replace(tmp_path, filepath)
+
+
+class CheckpointJournal:
+    """
+    Append-only, fsync'd JSON-lines journal of download work units.
+
+    Before a unit's files are written a "begin" record stores the file
+    names it will use; a "done" record follows once they are all in place.
+    A rerun skips done units and reuses the planned names of units that
+    were interrupted, so resuming never creates extra _N files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.planned = {}
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn last line from a crash mid-append
+                        continue
+                    if record["event"] == "begin":
+                        self.planned[record["key"]] = record["files"]
+                    elif record["event"] == "done":
+                        self.done.add(record["key"])
+
+    def append(self, record):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            fsync_write(f)
+
+    def is_done(self, key):
+        return key in self.done
+
+    def begin(self, key, files):
+        self.planned[key] = files
+        self.append({"event": "begin", "key": key, "files": files})
+
+    def complete(self, key):
+        self.done.add(key)
+        self.append({"event": "done", "key": key})
@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
-import requests
 import plotly.express as px
 from datetime import datetime, timedelta
 
+from ncei_client import NCEIClient
+from response_cache import ResponseCache
+
 # Set up the page
 st.set_page_config(page_title="Aviation Weather Data Analysis", layout="wide")
 st.title("Analysis of Weather Conditions and Flight Delays")
@@ -27,13 +29,16 @@ with st.sidebar:
     
     # Weather station selection (airport weather stations)
     st.markdown("### Airport Weather Station ID")
-    col1, col2 = st.columns(2)
-    with col1:
-        station = st.text_input("Primary Weather Station", "USW00094846", 
-                              help="e.g., USW00094846 (Chicago O'Hare Airport)")
-    with col2:
-        compare_station = st.text_input("Comparison Weather Station (Optional)", "",
-                                      help="Enter another station ID for comparison")
+    station = st.text_input("Primary Weather Station", "USW00094846", 
+                          help="e.g., USW00094846 (Chicago O'Hare Airport)")
+    compare_input = st.text_input("Comparison Weather Stations (Optional)", "",
+                                help="One or more station IDs, separated by commas")
+    compare_stations = [s.strip() for s in compare_input.split(",") if s.strip() and s.strip() != station]
+    compare_stations = list(dict.fromkeys(compare_stations))
+    
+    # Plot resolution; "auto" aggregates long ranges so charts stay light
+    resolution = st.radio("Plot Resolution", ["auto", "daily", "weekly", "monthly"], index=0,
+                          help="auto: daily up to 6 months, weekly up to 2 years, monthly beyond")
     
     # Unit selection
     units = st.radio("Unit System", ["metric", "standard"], index=0)
@@ -60,35 +65,55 @@ with st.sidebar:
     # Submit button
     submit_button = st.button("Fetch Weather Data")
 
-# Build API request URL
-def build_url(station, start_date, end_date, data_types, units="metric"):
-    base_url = "https://www.ncei.noaa.gov/access/services/data/v1"
-    
-    params = {
-        "dataset": "daily-summaries",
-        "stations": station,
-        "startDate": start_date,
-        "endDate": end_date,
-        "dataTypes": ",".join(data_types),
-        "units": units,
-        "format": "json",
-        "includeStationName": "true",
-        "includeStationLocation": "true"
-    }
-    
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    return f"{base_url}?{query_string}"
+# One pooled client per server process; responses are cached on disk, so
+# re-running a query for data we already have makes no network calls
+@st.cache_resource
+def get_client():
+    return NCEIClient(cache=ResponseCache())
 
-# Fetch data
-def fetch_data(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error(f"Failed to fetch data: {e}")
+# Fetch all stations concurrently; results are memoized per parameter set,
+# so re-clicking the button or switching tabs does not refetch. Results
+# with errors are dropped from the memo below so the next click retries
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_stations(stations, start_date, end_date, data_types, units="metric"):
+    client = get_client()
+    jobs = [{"station_id": s, "start_date": str(start_date), "end_date": str(end_date),
+             "data_types": list(data_types), "units": units} for s in stations]
+    frames, errors = {}, {}
+    for job, data, error in client.fetch_many(jobs):
+        if error is not None:
+            errors[job["station_id"]] = str(error)
+        else:
+            frames[job["station_id"]] = pd.DataFrame(data)
+    return frames, errors
+
+# Sum amounts, take the max of weather-type flags and average everything else
+SUM_COLS = ["PRCP", "SNOW"]
+
+def choose_frequency(start_date, end_date, resolution="auto"):
+    if resolution != "auto":
+        return {"daily": None, "weekly": "W", "monthly": "MS"}[resolution]
+    days = (end_date - start_date).days
+    if days <= 183:
         return None
+    return "W" if days <= 731 else "MS"
+
+def downsample(df, value_cols, freq):
+    """
+    Aggregate daily rows to freq per station before plotting.
+    """
+    if freq is None or df.empty:
+        return df
+    agg = {}
+    for col in value_cols:
+        if col in SUM_COLS:
+            agg[col] = "sum"
+        elif col.startswith("WT"):
+            agg[col] = "max"
+        else:
+            agg[col] = "mean"
+    return (df.groupby(["STATION", pd.Grouper(key="DATE", freq=freq)])
+              .agg(agg).reset_index())
 
 # Main interface
 if submit_button:
@@ -97,22 +122,33 @@ if submit_button:
     # 显示加载状态
     with st.spinner("正在获取数据..."):
         all_vars = basic_vars + aviation_vars
-        url = build_url(station, start_date, end_date, all_vars, units)
-        df = fetch_data(url)
+        frames, errors = fetch_stations(tuple([station] + compare_stations), start_date, end_date,
+                                        tuple(all_vars), units)
+        if errors:
+            # Don't serve a failed fetch from memory for the next hour; the
+            # stations that succeeded come back from the on-disk response cache
+            fetch_stations.clear()
+        for failed, error in errors.items():
+            st.error(f"Failed to fetch data for {failed}: {error}")
+        df = frames.get(station)
         
-        if compare_station:
-            compare_url = build_url(compare_station, start_date, end_date, all_vars, units)
-            df_compare = fetch_data(compare_url)
-            if df_compare is not None:
+        compare_frames = []
+        for compare_station in compare_stations:
+            df_compare = frames.get(compare_station)
+            if df_compare is not None and not df_compare.empty:
+                df_compare = df_compare.copy()
                 df_compare['STATION'] = df_compare['STATION'] + " (对比)"
+                compare_frames.append(df_compare)
+    multi_station = bool(compare_frames)
     
     if df is not None and not df.empty:
         st.success(f"Successfully fetched {len(df)} records")
         
         # 合并对比数据
-        if compare_station and df_compare is not None and not df_compare.empty:
-            df = pd.concat([df, df_compare])
-            st.success(f"Successfully fetched comparison station {len(df_compare)} records")
+        if compare_frames:
+            df = pd.concat([df] + compare_frames, ignore_index=True)
+            st.success(f"Successfully fetched {sum(len(f) for f in compare_frames)} records "
+                       f"from {len(compare_frames)} comparison station(s)")
         
         # Display station information
         if 'STATION' in df.columns and 'NAME' in df.columns:
@@ -149,6 +185,14 @@ if submit_button:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
+        # Line charts use aggregated data for long ranges
+        freq = choose_frequency(start_date, end_date, resolution)
+        value_cols = [col for col in df.columns if col in all_vars or col.startswith('WT')]
+        plot_df = downsample(df, value_cols, freq)
+        period = {None: 'Daily', 'W': 'Weekly', 'MS': 'Monthly'}[freq]
+        if freq is not None:
+            st.info(f"Showing {period.lower()} aggregates ({len(plot_df)} points from {len(df)} daily records)")
+        
         # Create tabs
         tab1, tab2, tab3 = st.tabs(["Temperature Analysis", "Aviation Weather Analysis", "Raw Data"])
         
@@ -156,22 +200,22 @@ if submit_button:
             # 温度数据可视化
             temp_cols = [col for col in ['TMAX', 'TMIN', 'TAVG'] if col in df.columns]
             if temp_cols:
-                fig_temp = px.line(df, x='DATE', y=temp_cols,
-                                 color='STATION' if compare_station else None,
-                                 title='Daily Temperature Changes',
+                fig_temp = px.line(plot_df, x='DATE', y=temp_cols,
+                                 color='STATION' if multi_station else None,
+                                 title=f'{period} Temperature Changes',
                                  labels={'value': f'Temperature ({unit_labels["TMAX"]})', 'DATE': 'Date'},
                                  color_discrete_map={
                                      'TMAX': 'red',
                                      'TMIN': 'blue',
                                      'TAVG': 'green'
                                  })
-                fig_temp.update_traces(mode='lines+markers')
+                fig_temp.update_traces(mode='lines+markers' if len(plot_df) <= 400 else 'lines')
                 st.plotly_chart(fig_temp, use_container_width=True)
             
             # 温度分布箱线图
             if temp_cols:
                 fig_box = px.box(df, y=temp_cols, 
-                               color='STATION' if compare_station else None,
+                               color='STATION' if multi_station else None,
                                title='Temperature Distribution Statistics',
                                labels={'value': f'Temperature ({unit_labels["TMAX"]})'})
                 st.plotly_chart(fig_box, use_container_width=True)
@@ -181,8 +225,8 @@ if submit_button:
             wind_cols = [col for col in ['AWND', 'WSF2', 'WSF5', 'GUST'] if col in df.columns]
             if wind_cols:
                 st.markdown("### Wind Speed Analysis")
-                fig_wind = px.line(df, x='DATE', y=wind_cols,
-                                  color='STATION' if compare_station else None,
+                fig_wind = px.line(plot_df, x='DATE', y=wind_cols,
+                                  color='STATION' if multi_station else None,
                                   title='Wind Speed Changes',
                                   labels={'value': f'Wind Speed ({unit_labels["AWND"]})', 'DATE': 'Date'})
                 st.plotly_chart(fig_wind, use_container_width=True)
@@ -192,7 +236,7 @@ if submit_button:
                     st.markdown("#### Wind Direction Frequency Analysis")
                     if 'WDF2' in df.columns:  # 风向数据
                         fig_windrose = px.bar_polar(df, r='AWND', theta='WDF2',
-                                                   color='STATION' if compare_station else None,
+                                                   color='STATION' if multi_station else None,
                                                    title='Wind Speed and Direction Rose Chart',
                                                    labels={'r': f'Wind Speed ({unit_labels["AWND"]})'})
                         st.plotly_chart(fig_windrose, use_container_width=True)
@@ -202,8 +246,8 @@ if submit_button:
             # 能见度分析
             if 'VIS' in df.columns:
                 st.markdown("### Visibility Analysis")
-                fig_vis = px.line(df, x='DATE', y='VIS',
-                                color='STATION' if compare_station else None,
+                fig_vis = px.line(plot_df, x='DATE', y='VIS',
+                                color='STATION' if multi_station else None,
                                 title='Visibility Changes',
                                 labels={'VIS': f'Visibility ({unit_labels["VIS"]})', 'DATE': 'Date'})
                 st.plotly_chart(fig_vis, use_container_width=True)
@@ -211,8 +255,8 @@ if submit_button:
             # 湿度分析
             if 'RH' in df.columns:
                 st.markdown("### Relative Humidity Analysis")
-                fig_rh = px.line(df, x='DATE', y='RH',
-                               color='STATION' if compare_station else None,
+                fig_rh = px.line(plot_df, x='DATE', y='RH',
+                               color='STATION' if multi_station else None,
                                title='Relative Humidity Changes',
                                labels={'RH': 'Relative Humidity (%)', 'DATE': 'Date'})
                 st.plotly_chart(fig_rh, use_container_width=True)
@@ -227,7 +271,7 @@ if submit_button:
                 
                 if not weather_df.empty:
                     fig_weather = px.histogram(weather_df, x='DATE', color='Weather Phenomenon',
-                                             facet_row='STATION' if compare_station else None,
+                                             facet_row='STATION' if multi_station else None,
                                              title='Occurrences of Adverse Weather Phenomena',
                                              labels={'count': 'Occurrences'})
                     st.plotly_chart(fig_weather, use_container_width=True)
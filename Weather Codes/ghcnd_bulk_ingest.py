@@ -0,0 +1,246 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm  # show progress bar
+
+from checkpoint import JOURNAL_NAME, CheckpointJournal
+from weather_downloader2 import DATA_TYPES, SuffixIndex, save_monthly_data, standardize_columns
+
+# Same elements as the API downloader, so both modes write the same
+# columns into a shared output directory
+ELEMENTS = DATA_TYPES
+
+# by_station/<ID>.csv.gz: no header, one observation per line
+BY_STATION_COLUMNS = ['STATION', 'DATE', 'ELEMENT', 'VALUE', 'M_FLAG', 'Q_FLAG', 'S_FLAG', 'OBS_TIME']
+MISSING_VALUE = -9999
+# Raw values are tenths of °C, mm and m/s; scale to the API's metric units
+SCALE = {'TMAX': 0.1, 'TMIN': 0.1, 'TAVG': 0.1, 'PRCP': 0.1, 'AWND': 0.1, 'WSF2': 0.1, 'WSF5': 0.1}
+
+# .dly: ID(0-11) YEAR(11-15) MONTH(15-17) ELEMENT(17-21), then 31 days of
+# VALUE(5) MFLAG(1) QFLAG(1) SFLAG(1)
+DLY_LINE_WIDTH = 269
+DLY_DAY_WIDTH = 8
+
+
+def find_station_file(input_dir, station_id):
+    """
+    Path of a station's bulk file in input_dir (.csv.gz, .csv or .dly), or None.
+    """
+    for suffix in (".csv.gz", ".csv", ".dly"):
+        path = os.path.join(input_dir, station_id + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_by_station_csv(path, elements, years, months, keep_flagged=False, chunk_rows=1_000_000):
+    """
+    Observations (DATE, ELEMENT, VALUE) of a by_station CSV for the given
+    elements, years and months, read in chunks. Values that failed a quality
+    check (non-blank Q_FLAG) are dropped unless keep_flagged.
+    """
+    frames = []
+    reader = pd.read_csv(path, header=None, names=BY_STATION_COLUMNS,
+                         usecols=['DATE', 'ELEMENT', 'VALUE', 'Q_FLAG'],
+                         dtype={'DATE': np.int64, 'ELEMENT': str, 'VALUE': np.int64, 'Q_FLAG': str},
+                         chunksize=chunk_rows)
+    for chunk in reader:
+        year = chunk['DATE'] // 10000
+        month = chunk['DATE'] // 100 % 100
+        keep = (chunk['ELEMENT'].isin(elements) & year.isin(years) & month.isin(months)
+                & (chunk['VALUE'] != MISSING_VALUE))
+        if not keep_flagged:
+            keep &= chunk['Q_FLAG'].isna()
+        frames.append(chunk.loc[keep, ['DATE', 'ELEMENT', 'VALUE']])
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['DATE', 'ELEMENT', 'VALUE'])
+    df['DATE'] = pd.to_datetime(df['DATE'].astype(str), format='%Y%m%d')
+    return df
+
+
+def read_dly(path, elements, years, months, keep_flagged=False):
+    """
+    Observations (DATE, ELEMENT, VALUE) of a .dly file. Lines are viewed as
+    a (rows, DLY_LINE_WIDTH) byte matrix, so each month's 31 values are cut
+    out for all lines at once.
+    """
+    with open(path, "rb") as f:
+        buffer = b"".join(line.rstrip(b"\r\n").ljust(DLY_LINE_WIDTH)[:DLY_LINE_WIDTH] for line in f)
+    matrix = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, DLY_LINE_WIDTH)
+
+    def field(start, end):
+        return np.ascontiguousarray(matrix[:, start:end]).view(f"S{end - start}").ravel()
+
+    year = field(11, 15).astype(int)
+    month = field(15, 17).astype(int)
+    element = field(17, 21).astype(str)
+    keep = np.isin(year, list(years)) & np.isin(month, list(months)) & np.isin(element, elements)
+    year, month, element = year[keep], month[keep], element[keep]
+
+    days = matrix[keep, 21:21 + 31 * DLY_DAY_WIDTH].reshape(-1, 31, DLY_DAY_WIDTH)
+    values = np.ascontiguousarray(days[:, :, :5]).view("S5").reshape(-1, 31).astype(int)
+    valid = values != MISSING_VALUE
+    if not keep_flagged:
+        valid &= days[:, :, 6] == ord(" ")
+
+    rows, day = np.nonzero(valid)
+    dates = pd.to_datetime(pd.DataFrame({'year': year[rows], 'month': month[rows], 'day': day + 1}),
+                           errors='coerce')
+    df = pd.DataFrame({'DATE': dates, 'ELEMENT': element[rows], 'VALUE': values[rows, day]})
+    return df.dropna(subset=['DATE'])
+
+
+def to_daily_frame(observations, elements):
+    """
+    Pivot observations to one row per date with one column per element, in
+    the API's metric units. WT flags are 1 where reported and blank otherwise.
+    """
+    scale = observations['ELEMENT'].map(SCALE).fillna(1.0)
+    observations = observations.assign(VALUE=observations['VALUE'] * scale)
+    wide = observations.pivot_table(index='DATE', columns='ELEMENT', values='VALUE', aggfunc='first')
+    wide = wide[[e for e in elements if e in wide.columns]]
+    for col in wide.columns:
+        if col.startswith('WT'):
+            wide[col] = wide[col].astype('Int64')
+        elif col in SCALE:
+            wide[col] = wide[col].round(1)
+    wide.columns.name = None
+    return wide.reset_index()
+
+
+def load_station(station_id, input_dir, elements, years, months, keep_flagged=False):
+    """
+    Daily frame of one station from its bulk file; None if there is no file
+    or it cannot be parsed, so one bad file only skips its station.
+    """
+    path = find_station_file(input_dir, station_id)
+    if path is None:
+        print(f"\nWarning: no bulk file for {station_id}")
+        return None
+    try:
+        if path.endswith(".dly"):
+            observations = read_dly(path, elements, years, months, keep_flagged)
+        else:
+            observations = read_by_station_csv(path, elements, years, months, keep_flagged)
+    except Exception as e:
+        print(f"\nFailed to read {path}: {e}")
+        return None
+    if observations.empty:
+        return pd.DataFrame()
+    return to_daily_frame(observations, elements)
+
+
+def load_station_meta(meta_csv, station_df):
+    """
+    NAME, LATITUDE, LONGITUDE and ELEVATION per station, named like the API
+    ("NAME, ST US"). Falls back to the coordinates in station_df.
+    """
+    meta = station_df.drop_duplicates('station_id').set_index('station_id')[['latitude', 'longitude', 'elevation']]
+    meta['name'] = pd.Series(None, index=meta.index, dtype=object)
+    if meta_csv and os.path.exists(meta_csv):
+        stations = pd.read_csv(meta_csv).drop_duplicates('station_id').set_index('station_id')
+        stations['name'] = np.where(stations['state'].notna(),
+                                    stations['name'] + ", " + stations['state'].astype(str) + " US",
+                                    stations['name'] + " US")
+        meta.update(stations[['latitude', 'longitude', 'elevation', 'name']])
+    return meta.rename(columns=str.upper)
+
+
+def add_station_columns(df, station_id, meta):
+    df.insert(0, 'STATION', station_id)
+    if station_id in meta.index:
+        row = meta.loc[station_id]
+        df.insert(1, 'NAME', row['NAME'])
+        df.insert(3, 'LATITUDE', row['LATITUDE'])
+        df.insert(4, 'LONGITUDE', row['LONGITUDE'])
+        df.insert(5, 'ELEVATION', row['ELEVATION'])
+    return standardize_columns(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingest NOAA GHCND by-station .csv.gz or .dly files into monthly weather CSVs.")
+    parser.add_argument("input_dir", help="directory of <station_id>.csv.gz / .csv / .dly files")
+    parser.add_argument("-o", "--output-dir", default="weather_data")
+    parser.add_argument("--stations", default="station/final_station_id.csv")
+    parser.add_argument("--station-meta", default="station/us_stations.csv",
+                        help="station table with name/state, used for the NAME column")
+    parser.add_argument("--years", type=int, nargs="+", default=list(range(2021, 2025)))
+    parser.add_argument("--months", type=int, nargs="+", default=[5, 6, 7, 8])
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="processes parsing station files")
+    parser.add_argument("--keep-flagged", action="store_true",
+                        help="keep values that failed a GHCND quality check")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoint journal and redo every station")
+    args = parser.parse_args()
+
+    station_df = pd.read_csv(args.stations)
+    station_df = station_df.dropna(subset=['IATA_CODE'])
+    meta = load_station_meta(args.station_meta, station_df)
+    years, months = sorted(args.years), sorted(args.months)
+    start_date, end_date = f"{years[0]}-01-01", f"{years[-1]}-12-31"
+
+    # Same journal keys as weather_downloader2.py, so the two modes can
+    # fill one output directory and skip each other's finished stations
+    os.makedirs(args.output_dir, exist_ok=True)
+    journal_path = os.path.join(args.output_dir, JOURNAL_NAME)
+    if args.restart and os.path.exists(journal_path):
+        os.remove(journal_path)
+    journal = CheckpointJournal(journal_path)
+    station_df['JOURNAL_KEY'] = [f"{iata}|{station}|{start_date}|{end_date}"
+                                 for iata, station in zip(station_df['IATA_CODE'], station_df['station_id'])]
+    pending = station_df[~station_df['JOURNAL_KEY'].map(journal.is_done)]
+    if len(pending) < len(station_df):
+        print(f"Resuming: {len(station_df) - len(pending)} stations already done")
+
+    index = SuffixIndex(args.output_dir)
+    for files in journal.planned.values():
+        for filename in files.values():
+            index.add(filename)
+
+    station_ids = list(dict.fromkeys(pending['station_id']))
+    remaining = pending['station_id'].value_counts().to_dict()
+    load = partial(load_station, input_dir=args.input_dir, elements=ELEMENTS,
+                   years=years, months=months, keep_flagged=args.keep_flagged)
+
+    start_time = time.time()
+    written = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Stations are parsed in parallel but saved in station-list order,
+        # so _N suffixes match a serial run
+        loaded = zip(station_ids, pool.map(load, station_ids))
+        frames = {}
+        for _, row in tqdm(pending.iterrows(), total=len(pending), desc="Ingesting stations"):
+            station_id = row['station_id']
+            iata_code = row['IATA_CODE']
+            while station_id not in frames:
+                loaded_id, df = next(loaded)
+                frames[loaded_id] = df
+            full_df = frames[station_id]
+            remaining[station_id] -= 1
+            if remaining[station_id] == 0:
+                del frames[station_id]
+
+            if full_df is None:
+                # left unjournaled, so a rerun retries it
+                continue
+            if full_df.empty:
+                journal.complete(row['JOURNAL_KEY'])
+                continue
+
+            df = add_station_columns(full_df.copy(), station_id, meta)
+            saved = save_monthly_data(df, iata_code, years, months, args.output_dir, index,
+                                      journal, row['JOURNAL_KEY'])
+            written += len(saved)
+
+    print(f"\nWrote {written} monthly files in {time.time() - start_time:.1f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://www.ncei.noaa.gov/access/services/data/v1"
+
+# NCEI asks clients to stay within 5 requests per second
+RATE_LIMIT = 5.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Bounds for packing several stations into one request
+MAX_URL_LENGTH = 2000
+MAX_RECORDS = 25000
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def day_count(start_date, end_date):
+    """
+    Days from start_date to end_date inclusive (dates or ISO strings).
+    """
+    return (date.fromisoformat(str(end_date)[:10]) - date.fromisoformat(str(start_date)[:10])).days + 1
+
+
+def make_session(pool_size=8):
+    """
+    A requests session whose connection pool fits pool_size concurrent requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class NCEIClient:
+    """
+    Client for the NCEI access/services/data/v1 API sharing one pooled
+    session across threads, with a rate limiter and exponential-backoff retries.
+
+    With a ResponseCache, cached responses are returned without touching the
+    network or the rate limiter.
+    """
+
+    def __init__(self, base_url=BASE_URL, max_workers=4, rate=RATE_LIMIT,
+                 max_retries=5, backoff=1.0, timeout=60, cache=None):
+        self.base_url = base_url
+        self.cache = cache
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate)
+        self.session = make_session(max_workers)
+
+    def build_params(self, station_id, start_date, end_date, data_types, units="metric"):
+        return {
+            "dataset": "daily-summaries",
+            "stations": station_id,
+            "startDate": start_date,
+            "endDate": end_date,
+            "dataTypes": ",".join(data_types),
+            "units": units,
+            "format": "json",
+            "includeStationName": "true",
+            "includeStationLocation": "true"
+        }
+
+    def get_json(self, params):
+        """
+        Decoded JSON for params, from the cache when possible.
+        """
+        if self.cache is not None:
+            data = self.cache.get(params)
+            if data is not None:
+                return data
+        data = self.request_json(params)
+        if self.cache is not None:
+            self.cache.put(params, data)
+        return data
+
+    def request_json(self, params):
+        """
+        GET base_url with params and return the decoded JSON. Retries
+        connection errors, 429 and 5xx with exponential backoff (honouring
+        Retry-After); other HTTP errors are raised immediately.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f"{response.status_code} from {response.url}", response=response)
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                retry_after = None
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+
+    def fetch(self, station_id, start_date, end_date, data_types, units="metric"):
+        """
+        Daily summaries for one station as a list of records.
+        """
+        return self.get_json(self.build_params(station_id, start_date, end_date, data_types, units))
+
+    def plan_batches(self, station_ids, start_date, end_date, data_types, units="metric",
+                     max_stations=None, max_url_length=MAX_URL_LENGTH, max_records=MAX_RECORDS):
+        """
+        Pack stations into batches for fetch_batch, keeping each request URL
+        under max_url_length and the expected response (one record per
+        station-day) under max_records.
+        """
+        days = day_count(start_date, end_date)
+        limit = max(1, max_records // max(days, 1))
+        if max_stations is not None:
+            limit = min(limit, max_stations)
+
+        batches = []
+        batch = []
+        for station_id in station_ids:
+            candidate = batch + [station_id]
+            url_length = len(requests.Request("GET", self.base_url, params=self.build_params(
+                ",".join(candidate), start_date, end_date, data_types, units)).prepare().url)
+            if batch and (len(candidate) > limit or url_length > max_url_length):
+                batches.append(batch)
+                candidate = [station_id]
+            batch = candidate
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def fetch_batch(self, station_ids, start_date, end_date, data_types, units="metric",
+                    max_records=MAX_RECORDS):
+        """
+        Daily summaries for several stations with one request, split back
+        into {station_id: records} by the STATION field. With a cache,
+        entries are read and stored per station, so batched and single
+        fetches share them. A multi-station response may be truncated: a
+        station with no records, or with fewer than one per day when the
+        response has max_records records, is refetched on its own and only
+        that answer is cached.
+        """
+        results = {}
+        missing = []
+        for station_id in station_ids:
+            params = self.build_params(station_id, start_date, end_date, data_types, units)
+            data = self.cache.get(params) if self.cache is not None else None
+            if data is None:
+                missing.append(station_id)
+            else:
+                results[station_id] = data
+        if not missing:
+            return results
+
+        records = self.request_json(self.build_params(
+            ",".join(missing), start_date, end_date, data_types, units))
+        by_station = {station_id: [] for station_id in missing}
+        for record in records:
+            station_id = record.get("STATION")
+            if station_id in by_station:
+                by_station[station_id].append(record)
+
+        days = day_count(start_date, end_date)
+        truncated = len(records) >= max_records
+        for station_id, data in by_station.items():
+            if len(missing) > 1 and (not data or (truncated and len(data) < days)):
+                results[station_id] = self.fetch(station_id, start_date, end_date, data_types, units)
+                continue
+            if self.cache is not None:
+                self.cache.put(self.build_params(station_id, start_date, end_date, data_types, units), data)
+            results[station_id] = data
+        return results
+
+    def fetch_many(self, jobs, fetch=None):
+        """
+        Run fetch(**job) for each job dict on max_workers threads and yield
+        (job, result, error) as they complete.
+        """
+        fetch = fetch or self.fetch
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(fetch, **job): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
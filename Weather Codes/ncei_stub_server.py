@@ -0,0 +1,116 @@
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def stub_records(stations, start_date, end_date, data_types):
+    """
+    Deterministic daily-summaries records shaped like the NCEI JSON response
+    (every value is a string, as in the real API).
+    """
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    records = []
+    for station in stations:
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            rng = random.Random(zlib.crc32(f"{station}{day}".encode()))
+            record = {
+                "STATION": station,
+                "DATE": day.isoformat(),
+                "NAME": f"STUB STATION {station}, US",
+                "LATITUDE": "40.0",
+                "LONGITUDE": "-90.0",
+                "ELEVATION": "200.0"
+            }
+            for data_type in data_types:
+                if data_type.startswith("WT"):
+                    if rng.random() < 0.1:
+                        record[data_type] = "1"
+                else:
+                    record[data_type] = f"{rng.uniform(0, 30):.1f}"
+            records.append(record)
+    return records
+
+
+def make_handler(fail_rate=0.0, delay=0.0):
+    """
+    Request handler class; fail_rate of requests get a 503 and each response
+    is delayed by `delay` seconds.
+    """
+    counter_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        requests_served = 0
+
+        def do_GET(self):
+            with counter_lock:
+                StubHandler.requests_served += 1
+            if delay:
+                time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                records = stub_records(
+                    query["stations"][0].split(","),
+                    query["startDate"][0],
+                    query["endDate"][0],
+                    query.get("dataTypes", [""])[0].split(",")
+                )
+            except (KeyError, ValueError) as e:
+                self.send_response(400)
+                self.end_headers()
+                self.wfile.write(str(e).encode())
+                return
+
+            body = json.dumps(records).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=0, fail_rate=0.0, delay=0.0):
+    """
+    Start the stub in a background thread. Returns (server, base_url); call
+    server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fail_rate, delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/access/services/data/v1"
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the NCEI access/services/data/v1 API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 503")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="seconds of latency added to each response")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.fail_rate, args.delay))
+    print(f"Serving stub NCEI API on http://127.0.0.1:{args.port}/access/services/data/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
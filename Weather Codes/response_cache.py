@@ -0,0 +1,153 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "NCEI_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ncei_cache"))
+
+# Cache key fields; anything else in the request params does not change the data
+KEY_FIELDS = ("dataset", "stations", "startDate", "endDate", "dataTypes", "units")
+
+
+class ResponseCache:
+    """
+    Persistent cache of NCEI JSON responses, one gzip file per request.
+
+    Responses whose endDate is more than recent_days ago never expire (NCEI
+    does not revise settled history); ranges touching recent days expire
+    after ttl seconds. When the cache grows past max_bytes, the least
+    recently used entries (by file mtime, refreshed on every hit) are evicted.
+    The size is tracked as a running total, so the directory is only scanned
+    once at start and then whenever the total passes max_bytes; eviction
+    goes down to low_water * max_bytes to leave room before the next scan.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 ** 2,
+                 recent_days=10, ttl=6 * 3600, low_water=0.9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.recent_days = recent_days
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # bytes on disk, None until the first scan
+        self.total_bytes = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, params):
+        """
+        Hash of (dataset, station(s), date range, data types, units); the
+        order of stations and data types does not matter.
+        """
+        fields = {}
+        for field in KEY_FIELDS:
+            value = str(params.get(field, ""))
+            if field in ("stations", "dataTypes"):
+                value = ",".join(sorted(v for v in value.split(",") if v))
+            fields[field] = value
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def expires_at(self, params, fetched_at):
+        """
+        None for settled history, otherwise fetched_at + ttl.
+        """
+        end_date = date.fromisoformat(str(params["endDate"])[:10])
+        if end_date < date.today() - timedelta(days=self.recent_days):
+            return None
+        return fetched_at + self.ttl
+
+    def get(self, params):
+        """
+        Cached response for params, or None on a miss or an expired entry.
+        """
+        path = self.path(self.key(params))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, EOFError, ValueError):
+            return None
+
+        if entry["expires_at"] is not None and entry["expires_at"] < time.time():
+            self.remove(path)
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return entry["data"]
+
+    def put(self, params, data):
+        """
+        Store a response atomically, then evict down to max_bytes if the
+        running total says the cache is over it.
+        """
+        fetched_at = time.time()
+        entry = {
+            "params": {field: str(params.get(field, "")) for field in KEY_FIELDS},
+            "fetched_at": fetched_at,
+            "expires_at": self.expires_at(params, fetched_at),
+            "data": data
+        }
+        path = self.path(self.key(params))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += size - replaced
+            over = self.total_bytes is None or self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Rescan the cache directory, resetting the running total. Over
+        max_bytes, delete least recently used entries down to
+        low_water * max_bytes.
+        """
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json.gz"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * self.low_water if total > self.max_bytes else self.max_bytes
+            for _, size, name in sorted(entries):
+                if total <= target:
+                    break
+                self.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            self.total_bytes = total
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json.gz"):
+                self.remove(os.path.join(self.cache_dir, name))
+        with self.lock:
+            self.total_bytes = 0
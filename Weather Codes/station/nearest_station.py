@@ -0,0 +1,134 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from parse_ghcnd_stations import parse_stations
+
+STATION_DIR = Path(__file__).resolve().parent
+REPO_ROOT = STATION_DIR.parent.parent
+AIRPORTS_GEOJSON = REPO_ROOT / "earth-usa_visualize" / "assets" / "airports.geojson"
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def load_stations(path, prefix=None):
+    """
+    Read stations from ghcnd-stations.txt, a parse_ghcnd_stations.py Parquet
+    table or one of the station CSVs (station_id, latitude, longitude, ...).
+    Optionally keep only IDs starting with prefix, e.g. 'USW'.
+    """
+    path = Path(path)
+    if path.suffix == ".txt":
+        stations = parse_stations(path, prefix or "", airport_only=False)
+    elif path.suffix == ".parquet":
+        stations = pd.read_parquet(path)
+        stations['state'] = stations['state'].astype(object)
+    else:
+        stations = pd.read_csv(path)
+    if prefix:
+        stations = stations[stations['station_id'].str.startswith(prefix)]
+    # Sorted so that stations at identical distances rank the same for any input order
+    return stations.dropna(subset=['latitude', 'longitude']).sort_values('station_id').reset_index(drop=True)
+
+
+def load_airports(geojson_path=AIRPORTS_GEOJSON):
+    """
+    IATA code, city, state and coordinates of each airport in the geojson.
+    """
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        features = json.load(f)["features"]
+
+    airports = pd.DataFrame({
+        'IATA_CODE': [feat['properties']['IATA'] for feat in features],
+        'AIRPT_NAME': [feat['properties']['AIRPT_NAME'] for feat in features],
+        'airport_longitude': [feat['geometry']['coordinates'][0] for feat in features],
+        'airport_latitude': [feat['geometry']['coordinates'][1] for feat in features]
+    })
+    # AIRPT_NAME is "City, ST"
+    airports[['city', 'state']] = airports['AIRPT_NAME'].str.rsplit(', ', n=1, expand=True)
+    return airports.drop(columns='AIRPT_NAME').dropna(
+        subset=['airport_latitude', 'airport_longitude']).reset_index(drop=True)
+
+
+def build_station_tree(stations):
+    """
+    Haversine BallTree over station coordinates (in radians).
+    """
+    return BallTree(np.radians(stations[['latitude', 'longitude']].to_numpy(dtype=float)),
+                    metric='haversine')
+
+
+def match_airports(airports, stations, k=3, radius_km=25.0, tree=None):
+    """
+    Up to k nearest stations per airport within radius_km, ranked by
+    distance. Returns one row per (airport, candidate) with rank (1 =
+    nearest) and distance_km; airports with no station in range are left out.
+    """
+    if tree is None:
+        tree = build_station_tree(stations)
+    k = min(k, len(stations))
+    points = np.radians(airports[['airport_latitude', 'airport_longitude']].to_numpy(dtype=float))
+    distances, indices = tree.query(points, k=k)
+    distances_km = distances * EARTH_RADIUS_KM
+
+    candidates = pd.DataFrame({
+        'airport_row': np.repeat(np.arange(len(airports)), k),
+        'rank': np.tile(np.arange(1, k + 1), len(airports)),
+        'station_row': indices.ravel(),
+        'distance_km': distances_km.ravel().round(3)
+    })
+    candidates = candidates[candidates['distance_km'] <= radius_km]
+
+    result = pd.concat([
+        airports.iloc[candidates['airport_row']].reset_index(drop=True),
+        stations.iloc[candidates['station_row']].reset_index(drop=True).drop(columns='state', errors='ignore'),
+        candidates[['rank', 'distance_km']].reset_index(drop=True)
+    ], axis=1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match airports to their nearest GHCND stations.")
+    parser.add_argument("stations", nargs="?", default=str(STATION_DIR / "us_stations.csv"),
+                        help="ghcnd-stations.txt or a station CSV")
+    parser.add_argument("-o", "--output", default=str(STATION_DIR / "station_candidates.csv"))
+    parser.add_argument("--airports", default=str(AIRPORTS_GEOJSON))
+    parser.add_argument("--airport-ids", default=str(STATION_DIR / "airport_id.csv"),
+                        help="airport_id.csv, used to add BTS airport IDs")
+    parser.add_argument("-k", type=int, default=3, help="candidates per airport")
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--prefix", default=None, help="keep only station IDs with this prefix, e.g. USW")
+    args = parser.parse_args()
+
+    stations = load_stations(args.stations, args.prefix)
+    airports = load_airports(args.airports)
+
+    start_time = time.time()
+    result = match_airports(airports, stations, args.k, args.radius_km)
+    match_time = time.time() - start_time
+
+    if Path(args.airport_ids).exists():
+        airport_ids = pd.read_csv(args.airport_ids)[['IATA_CODE', 'AIRPORT_ID']].drop_duplicates('IATA_CODE')
+        result = result.merge(airport_ids, on='IATA_CODE', how='left').rename(columns={'AIRPORT_ID': 'airport_id'})
+        result['airport_id'] = result['airport_id'].astype('Int64')
+
+    # Same leading columns as final_station_id.csv, then the ranking
+    leading = ['station_id', 'airport_id', 'state', 'city', 'IATA_CODE', 'longitude', 'latitude', 'elevation']
+    columns = [c for c in leading if c in result.columns]
+    columns += [c for c in ['rank', 'distance_km', 'name', 'airport_longitude', 'airport_latitude']
+                if c in result.columns]
+    result = result[columns].sort_values(['IATA_CODE', 'rank'])
+
+    result.to_csv(args.output, index=False)
+    print(f"Matched {result['IATA_CODE'].nunique()} of {len(airports)} airports "
+          f"to {len(result)} station candidates in {match_time:.3f} seconds")
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
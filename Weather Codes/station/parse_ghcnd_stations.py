@@ -0,0 +1,110 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STATION_DIR = Path(__file__).resolve().parent
+
+# Fixed-width layout of ghcnd-stations.txt: (column, start, end), 0-based
+LINE_WIDTH = 85
+FIELDS = [
+    ('station_id', 0, 11),
+    ('latitude', 12, 20),
+    ('longitude', 21, 30),
+    ('elevation', 31, 37),
+    ('state', 38, 40),
+    ('name', 41, 71),
+    ('additional_info', 72, 75)
+]
+NUMERIC_FIELDS = {'latitude', 'longitude', 'elevation'}
+AP_PATTERN = re.compile(r'\bAP\b', re.IGNORECASE)
+
+
+def parse_block(lines):
+    """
+    Slice a list of raw byte lines into a DataFrame. Lines are padded to
+    LINE_WIDTH and viewed as a (rows, LINE_WIDTH) byte matrix, so every field
+    is cut out for all rows at once.
+    """
+    buffer = b"".join(line.rstrip(b"\r\n").ljust(LINE_WIDTH)[:LINE_WIDTH] for line in lines)
+    matrix = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, LINE_WIDTH)
+
+    columns = {}
+    for name, start, end in FIELDS:
+        field = np.ascontiguousarray(matrix[:, start:end]).view(f"S{end - start}").ravel()
+        field = np.char.strip(field)
+        if name in NUMERIC_FIELDS:
+            columns[name] = pd.to_numeric(pd.Series(field.astype(str)), errors='coerce').to_numpy()
+        else:
+            columns[name] = field.astype(str)
+    df = pd.DataFrame(columns)
+    # Blank optional fields become missing, like read_fwf
+    df['state'] = df['state'].replace('', np.nan)
+    df['additional_info'] = df['additional_info'].replace('', np.nan)
+    return df
+
+
+def parse_stations(input_file, prefix="USW", airport_only=True, block_lines=65536):
+    """
+    Stream ghcnd-stations.txt and return the stations whose ID starts with
+    prefix and, if airport_only, whose name or additional info contains a
+    standalone "AP". The prefix is checked on the raw bytes before a block is
+    parsed, so non-matching stations are never decoded.
+    """
+    prefix_bytes = prefix.encode() if prefix else b""
+    frames = []
+    with open(input_file, "rb") as f:
+        while True:
+            lines = f.readlines(block_lines * (LINE_WIDTH + 1))
+            if not lines:
+                break
+            if prefix_bytes:
+                lines = [line for line in lines if line.startswith(prefix_bytes)]
+            if not lines:
+                continue
+            block = parse_block(lines)
+            if airport_only:
+                is_ap = (block['name'].str.contains(AP_PATTERN, na=False) |
+                         block['additional_info'].str.contains(AP_PATTERN, na=False))
+                block = block[is_ap]
+            frames.append(block)
+
+    if not frames:
+        return pd.DataFrame(columns=[name for name, _, _ in FIELDS])
+    return pd.concat(frames, ignore_index=True)
+
+
+def save_stations(df, output_file):
+    """
+    Write the station table as Parquet, or CSV if output_file ends in .csv.
+    """
+    if str(output_file).endswith(".csv"):
+        df.to_csv(output_file, index=False)
+    else:
+        df.astype({'state': 'category'}).to_parquet(output_file, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse ghcnd-stations.txt into a filtered station table in one pass.")
+    parser.add_argument("input", nargs="?", default=str(STATION_DIR / "ghcnd-stations.txt"))
+    parser.add_argument("-o", "--output", default=str(STATION_DIR / "us_ap_stations.parquet"),
+                        help=".parquet (default) or .csv")
+    parser.add_argument("--prefix", default="USW",
+                        help="station ID prefix to keep; empty string keeps all")
+    parser.add_argument("--all-stations", action="store_true",
+                        help="skip the standalone 'AP' filter")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    stations = parse_stations(args.input, args.prefix, not args.all_stations)
+    save_stations(stations, args.output)
+    print(f"Parsed {len(stations)} stations in {time.time() - start_time:.2f} seconds")
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
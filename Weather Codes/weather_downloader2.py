@@ -1,35 +1,43 @@
+import argparse
+import re
 import pandas as pd
-import requests
 from datetime import datetime
 import os
-import time
 from tqdm import tqdm  # show progress bar
 
-def fetch_weather_data(station_id, start_date, end_date, data_types, units="metric"):
+from checkpoint import JOURNAL_NAME, CheckpointJournal, write_csv_atomic
+from ncei_client import BASE_URL, RATE_LIMIT, NCEIClient
+from response_cache import ResponseCache
+
+_default_client = None
+
+FILENAME_PATTERN = re.compile(r"^([A-Z0-9]+_\d{4}_[A-Za-z]{3})_(\d+)\.csv$")
+
+DATA_TYPES = [
+    "TMAX", "TMIN", "TAVG",    # Temperature
+    "PRCP", "SNOW",             # precipitation
+    "AWND", "WSF2", "WSF5",     # wind speed
+    "RH", "VIS",                # humidity and visibility
+    "WT01", "WT03"              # weather phenomena (fog, thunderstorms)
+]
+
+def get_client(client=None):
+    """
+    Return client, or a shared default NCEIClient backed by the response cache
+    """
+    global _default_client
+    if client is not None:
+        return client
+    if _default_client is None:
+        _default_client = NCEIClient(cache=ResponseCache())
+    return _default_client
+
+def fetch_weather_data(station_id, start_date, end_date, data_types, units="metric", client=None):
     """
     Get weather data from NCEI API
     """
-    base_url = "https://www.ncei.noaa.gov/access/services/data/v1"
-    
-    params = {
-        "dataset": "daily-summaries",
-        "stations": station_id,
-        "startDate": start_date,
-        "endDate": end_date,
-        "dataTypes": ",".join(data_types),
-        "units": units,
-        "format": "json",
-        "includeStationName": "true",
-        "includeStationLocation": "true"
-    }
-    
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{base_url}?{query_string}"
-    
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = get_client(client).fetch(station_id, start_date, end_date, data_types, units)
         df = pd.DataFrame(data)
         
         # 规范化列名和顺序
@@ -41,6 +49,25 @@ def fetch_weather_data(station_id, start_date, end_date, data_types, units="metr
         print(f"\nFailed to get data (site{station_id}): {e}")
         return None
 
+def fetch_weather_batch(station_ids, start_date, end_date, data_types, units="metric", client=None):
+    """
+    Get weather data for several stations with one request; returns
+    {station_id: DataFrame}
+    """
+    try:
+        records = get_client(client).fetch_batch(station_ids, start_date, end_date, data_types, units)
+    except Exception as e:
+        print(f"\nFailed to get data (sites {','.join(station_ids)}): {e}")
+        return {}
+
+    results = {}
+    for station_id, data in records.items():
+        df = pd.DataFrame(data)
+        if not df.empty:
+            df = standardize_columns(df)
+        results[station_id] = df
+    return results
+
 def standardize_columns(df):
     """
     Standardize data column order and format
@@ -76,78 +103,176 @@ def standardize_columns(df):
     
     return df
 
-def save_monthly_data(df, iata_code, year, month, output_dir="weather_data"):
+class SuffixIndex:
     """
-    Save monthly data as a CSV file according to the specified naming convention
+    In-memory index of the highest _N suffix used per IATA_YYYY_Mon in
+    output_dir, built with a single directory listing
+    """
+    def __init__(self, output_dir="weather_data"):
+        self.counters = {}
+        if os.path.isdir(output_dir):
+            for filename in os.listdir(output_dir):
+                self.add(filename)
+
+    def add(self, filename):
+        """
+        Count filename as used, e.g. a name planned by an interrupted run
+        """
+        match = FILENAME_PATTERN.match(filename)
+        if match:
+            prefix, counter = match.group(1), int(match.group(2))
+            self.counters[prefix] = max(self.counters.get(prefix, 0), counter)
+
+    def next_filename(self, iata_code, year, month_name):
+        prefix = f"{iata_code}_{year}_{month_name}"
+        counter = self.counters.get(prefix, 0) + 1
+        self.counters[prefix] = counter
+        return f"{prefix}_{counter}.csv"
+
+def save_monthly_data(df, iata_code, years, months, output_dir="weather_data", index=None,
+                      journal=None, key=None):
+    """
+    Save each requested (year, month) of a station frame as a CSV file
+    according to the specified naming convention, in one pass.
+    Returns the set of (year, month) that were written.
+
+    With a journal, the file names are recorded under key before writing
+    (unless plan_filenames already reserved them) and the key is marked
+    done afterwards; an interrupted key reuses its recorded names.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    
-    # filter out the monthly data
-    df['DATE'] = pd.to_datetime(df['DATE'])
-    monthly_df = df[(df['DATE'].dt.year == year) & (df['DATE'].dt.month == month)]
-    
-    if monthly_df.empty:
-        return False
-    
-    # generate filename
-    month_name = datetime(year, month, 1).strftime('%b')  # get the month's abbreviation
-    filename = f"{iata_code}_{year}_{month_name}_1.csv"
-    filepath = os.path.join(output_dir, filename)
-    
-    # multiple files check
-    counter = 1
-    while os.path.exists(filepath):
-        counter += 1
-        filename = f"{iata_code}_{year}_{month_name}_{counter}.csv"
-        filepath = os.path.join(output_dir, filename)
-    
-    monthly_df.to_csv(filepath, index=False)
-    return True
+    if index is None:
+        index = SuffixIndex(output_dir)
+
+    # parse dates once and split the frame in one groupby
+    dates = pd.to_datetime(df['DATE'])
+    groups = [(year, month, monthly_df)
+              for (year, month), monthly_df in df.groupby([dates.dt.year, dates.dt.month], sort=True)
+              if year in years and month in months]
+
+    # generate filenames
+    planned = journal.planned.get(key, {}) if journal is not None else {}
+    filenames = {}
+    new_names = False
+    for year, month, _ in groups:
+        month_key = f"{year}-{month:02d}"
+        if month_key not in planned:
+            month_name = datetime(year, month, 1).strftime('%b')  # get the month's abbreviation
+            planned[month_key] = index.next_filename(iata_code, year, month_name)
+            new_names = True
+        filenames[month_key] = planned[month_key]
+    if journal is not None and new_names:
+        journal.begin(key, filenames)
+
+    saved = set()
+    for year, month, monthly_df in groups:
+        filepath = os.path.join(output_dir, filenames[f"{year}-{month:02d}"])
+        write_csv_atomic(monthly_df, filepath)
+        saved.add((year, month))
+
+    if journal is not None:
+        journal.complete(key)
+    return saved
+
+def plan_filenames(stations, years, months, output_dir, journal):
+    """
+    Reserve every (year, month) file name of each (iata_code, key) in
+    stations, in order, and journal them before anything is fetched, so
+    _N suffixes do not depend on which request finishes first and a kill
+    mid-fetch resumes with the same names. Returns the SuffixIndex.
+    """
+    index = SuffixIndex(output_dir)
+    for files in journal.planned.values():
+        for filename in files.values():
+            index.add(filename)
+    for iata_code, key in stations:
+        if key in journal.planned:
+            continue
+        journal.begin(key, {f"{year}-{month:02d}": index.next_filename(
+            iata_code, year, datetime(year, month, 1).strftime('%b'))
+            for year in years for month in months})
+    return index
 
 def main():
+    parser = argparse.ArgumentParser(description="Download NCEI daily summaries for airport stations.")
+    parser.add_argument("-j", "--workers", type=int, default=4,
+                        help="concurrent requests")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT,
+                        help="maximum requests per second")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="API endpoint, e.g. a local ncei_stub_server.py")
+    parser.add_argument("-o", "--output-dir", default="weather_data")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="most stations per request (default: as many as fit the URL/response limits)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always hit the API instead of the local response cache")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoint journal and redo every station")
+    args = parser.parse_args()
 
     station_df = pd.read_csv('station/final_station_id.csv')
     station_df = station_df.dropna(subset=['IATA_CODE'])
 
-    data_types = [
-        "TMAX", "TMIN", "TAVG",    # Temperature
-        "PRCP", "SNOW",             # precipitation
-        "AWND", "WSF2", "WSF5",     # wind speed
-        "RH", "VIS",                # humidity and visibility
-        "WT01", "WT03"              # weather phenomena (fog, thunderstorms)
-    ]
+    data_types = DATA_TYPES
     
     years = range(2021, 2025)  # 2021-2024
     months = [5, 6, 7, 8]      # 5-8 months
     
     print(f"\n Started acquiring weather data(2021-2024/5-8 months)...")
-    
-    # Iterate through each station
-    for _, row in tqdm(station_df.iterrows(), total=len(station_df), desc="Processing stations"):
-        station_id = row['station_id']
-        iata_code = row['IATA_CODE']
-        
-        # Get the complete data for the station
-        full_df = fetch_weather_data(
-            station_id=station_id,
-            start_date="2021-01-01",
-            end_date="2024-12-31",
-            data_types=data_types
-        )
-        
-        if full_df is None or full_df.empty:
-            continue
-        
-        # Save monthly data
-        for year in years:
-            for month in months:
-                saved = save_monthly_data(full_df, iata_code, year, month)
-                if not saved:
-                    print(f"\nWarning: {iata_code} {year}-{month} no data")
-        
-        # Avoid excessive API requests
-        time.sleep(1)
+
+    # Requests share one pooled session and are paced by the client's rate limiter
+    cache = None if args.no_cache else ResponseCache()
+    client = NCEIClient(base_url=args.base_url, max_workers=args.workers, rate=args.rate, cache=cache)
+    start_date, end_date = "2021-01-01", "2024-12-31"
+
+    # Stations already saved by an earlier (possibly interrupted) run are skipped
+    os.makedirs(args.output_dir, exist_ok=True)
+    journal_path = os.path.join(args.output_dir, JOURNAL_NAME)
+    if args.restart and os.path.exists(journal_path):
+        os.remove(journal_path)
+    journal = CheckpointJournal(journal_path)
+    station_df['JOURNAL_KEY'] = [f"{iata}|{station}|{start_date}|{end_date}"
+                                 for iata, station in zip(station_df['IATA_CODE'], station_df['station_id'])]
+    pending = station_df[~station_df['JOURNAL_KEY'].map(journal.is_done)]
+    if len(pending) < len(station_df):
+        print(f"Resuming: {len(station_df) - len(pending)} stations already done")
+
+    # Pack several stations into each request; responses are split back by STATION
+    station_ids = list(dict.fromkeys(pending['station_id']))
+    batches = client.plan_batches(station_ids, start_date, end_date, data_types,
+                                  max_stations=args.batch_size)
+    jobs = [{
+        'station_ids': batch,
+        'start_date': start_date,
+        'end_date': end_date,
+        'data_types': data_types,
+        'client': client
+    } for batch in batches]
+    print(f"{len(station_ids)} stations in {len(jobs)} requests")
+
+    # File names are reserved in station order up front; each station is
+    # saved and journaled as soon as its batch arrives
+    stations = {}
+    for iata_code, station_id, key in zip(pending['IATA_CODE'], pending['station_id'], pending['JOURNAL_KEY']):
+        stations.setdefault(station_id, []).append((iata_code, key))
+    index = plan_filenames([entry for entries in stations.values() for entry in entries],
+                           years, months, args.output_dir, journal)
+
+    for _, batch_results, _ in tqdm(client.fetch_many(jobs, fetch=fetch_weather_batch),
+                                    total=len(jobs), desc="Processing station batches"):
+        for station_id, full_df in batch_results.items():
+            for iata_code, key in stations.get(station_id, []):
+                if full_df.empty:
+                    journal.complete(key)
+                    continue
+
+                saved = save_monthly_data(full_df, iata_code, years, months, args.output_dir, index,
+                                          journal, key)
+                for year in years:
+                    for month in months:
+                        if (year, month) not in saved:
+                            print(f"\nWarning: {iata_code} {year}-{month} no data")
     
     print("\nAll data processing completed!")
 
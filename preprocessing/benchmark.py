@@ -0,0 +1,301 @@
+import argparse
+import ast
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from preprocess import (add_utc_times, apply_schema, attach_airport_attributes,
+                        build_airport_dimension, clean_flight_data, recode_flight_data,
+                        to_utc, to_utc_vectorized, transform_flight_data)
+from run_preprocess import peak_memory_mb
+from synthetic_data import load_airports, write_flight_csv, write_weather_files
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEATHER_NOTEBOOK = os.path.join(REPO_ROOT, "Models", "cancelled_prob_rf.ipynb")
+WEATHER_FUNCTIONS = ['load_weather_data', 'match_weather_data', 'match_destination_weather_data']
+
+# The notebook matchers call into Models/weather_join.py
+sys.path.insert(0, os.path.join(REPO_ROOT, "Models"))
+import weather_join  # noqa: E402
+
+STAGES = ['read', 'recode', 'merge', 'utc', 'write', 'clean_flight_data',
+          'weather_load', 'weather_match', 'weather_match_dest']
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def make_utc_frame(n_rows, airport_tz_csv="airport_timezone.csv", seed=2025):
+    """
+    Build a flight-like frame with YEAR/MONTH/DAY/SCH_DEP_TIME/ORIGIN_TZ columns,
+    including missing values and DST-ambiguous / nonexistent local times.
+    """
+    rng = np.random.default_rng(seed)
+    zones = pd.read_csv(airport_tz_csv)['iana_tz'].dropna()
+    zones = zones[zones.str.startswith(('America/', 'Pacific/Honolulu'))].unique()
+
+    df = pd.DataFrame({
+        'YEAR': rng.integers(2021, 2025, n_rows),
+        'MONTH': rng.integers(1, 13, n_rows),
+        'DAY': rng.integers(1, 32, n_rows),
+        'SCH_DEP_TIME': (rng.integers(0, 24, n_rows) * 100 +
+                         rng.integers(0, 60, n_rows)).astype(float),
+        'ORIGIN_TZ': rng.choice(zones, n_rows)
+    })
+
+    # Missing times / timezones
+    df.loc[rng.random(n_rows) < 0.01, 'SCH_DEP_TIME'] = np.nan
+    df.loc[rng.random(n_rows) < 0.01, 'ORIGIN_TZ'] = np.nan
+
+    # Spring-forward (nonexistent) and fall-back (ambiguous) times
+    edge = rng.random(n_rows) < 0.01
+    df.loc[edge, ['YEAR', 'MONTH', 'DAY', 'SCH_DEP_TIME']] = [2021, 3, 14, 230]
+    edge = rng.random(n_rows) < 0.01
+    df.loc[edge, ['YEAR', 'MONTH', 'DAY', 'SCH_DEP_TIME']] = [2021, 11, 7, 130]
+    return df
+
+
+def benchmark_utc(n_rows=100000, airport_tz_csv="airport_timezone.csv"):
+    """
+    Time the row-wise to_utc path against to_utc_vectorized and check they agree.
+    """
+    df = make_utc_frame(n_rows, airport_tz_csv)
+
+    start_time = time.time()
+    expected = pd.to_datetime(df.apply(
+        lambda r: to_utc(r, 'SCH_DEP_TIME', 'ORIGIN_TZ'), axis=1), utc=True)
+    row_time = time.time() - start_time
+
+    start_time = time.time()
+    actual = to_utc_vectorized(df, 'SCH_DEP_TIME', 'ORIGIN_TZ')
+    vec_time = time.time() - start_time
+
+    pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+    print(f"Rows: {n_rows}")
+    print(f"Row-wise to_utc: {row_time:.2f} seconds")
+    print(f"Vectorized to_utc: {vec_time:.2f} seconds")
+    print(f"Speedup: {row_time / max(vec_time, 1e-9):.1f}x")
+    return {'rows': n_rows, 'row_wise_s': row_time, 'vectorized_s': vec_time}
+
+
+def load_notebook_functions(notebook, names, namespace):
+    """
+    Define the named top-level functions from a notebook's code cells in
+    namespace, without running the rest of the notebook.
+    """
+    with open(notebook, "r", encoding="utf-8") as f:
+        cells = json.load(f)['cells']
+
+    found = set()
+    for cell in cells:
+        if cell['cell_type'] != 'code':
+            continue
+        try:
+            tree = ast.parse(''.join(cell['source']))
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name in names and node.name not in found:
+                module = ast.Module(body=[node], type_ignores=[])
+                exec(compile(module, notebook, 'exec'), namespace)
+                found.add(node.name)
+
+    missing = set(names) - found
+    if missing:
+        raise KeyError(f"Functions not found in {notebook}: {sorted(missing)}")
+    return namespace
+
+
+def prepare_inputs(work_dir, sizes, seed=2025):
+    """
+    Generate (or reuse) one synthetic raw CSV per size plus a weather directory.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    airports = load_airports()
+    raw_files = {}
+    for n_rows in sizes:
+        raw_csv = os.path.join(work_dir, f"raw_{n_rows}.csv")
+        if not os.path.exists(raw_csv):
+            print(f"Generating {n_rows} flights -> {raw_csv}")
+            write_flight_csv(raw_csv, n_rows, 2021, 5, airports, seed)
+        raw_files[n_rows] = raw_csv
+
+    weather_dir = os.path.join(work_dir, "weather_data")
+    if not os.path.isdir(weather_dir):
+        print(f"Generating weather files -> {weather_dir}")
+        write_weather_files(weather_dir, [2021], [5], airports, seed=seed)
+    return raw_files, weather_dir
+
+
+def stage_peak_rss_mb():
+    """
+    Peak RSS of this process in MB. On Linux this reads VmHWM, which starts
+    fresh in a spawned process; ru_maxrss would carry over the parent's peak
+    across exec.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_memory_mb()
+
+
+def _run_timed(stage, raw_csv, df, airport_dim, output_csv, namespace):
+    """
+    The timed part of run_stage; returns the number of rows processed.
+    """
+    if stage == 'read':
+        return len(pd.read_csv(raw_csv))
+    if stage == 'recode':
+        return len(recode_flight_data(df))
+    if stage == 'merge':
+        df = attach_airport_attributes(df, airport_dim, 'ORIGIN_IATA', 'ORIGIN')
+        return len(attach_airport_attributes(df, airport_dim, 'DEST_IATA', 'DEST'))
+    if stage == 'utc':
+        return len(add_utc_times(df))
+    if stage == 'write':
+        apply_schema(df).to_csv(output_csv, index=False)
+        return len(df)
+    if stage == 'clean_flight_data':
+        return clean_flight_data(raw_csv, None, None, output_csv, airport_dim=airport_dim)
+    if stage == 'weather_load':
+        return sum(len(w) for w in namespace['load_weather_data']().values())
+    if stage == 'weather_match':
+        return len(namespace['match_weather_data'](df))
+    if stage == 'weather_match_dest':
+        return len(namespace['match_destination_weather_data'](df))
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_stage(stage, raw_csv, weather_dir, work_dir,
+              airport_info_csv="our_airports_info.csv", airport_tz_csv="airport_timezone.csv"):
+    """
+    Run one stage on one input and time only the stage itself; whatever the
+    stage consumes is built first, untimed. Meant to run in a fresh process
+    so peak RSS belongs to this stage alone.
+    """
+    airport_dim = build_airport_dimension(airport_info_csv, airport_tz_csv)
+    output_csv = os.path.join(work_dir, f"out_{os.getpid()}.csv")
+    namespace = None
+
+    df = None
+    if stage not in ('read', 'clean_flight_data', 'weather_load'):
+        df = pd.read_csv(raw_csv)
+    if stage in ('merge', 'utc', 'write', 'weather_match', 'weather_match_dest'):
+        df = recode_flight_data(df)
+    if stage in ('utc', 'write', 'weather_match', 'weather_match_dest'):
+        df = attach_airport_attributes(df, airport_dim, 'ORIGIN_IATA', 'ORIGIN')
+        df = attach_airport_attributes(df, airport_dim, 'DEST_IATA', 'DEST')
+    if stage == 'write':
+        df = add_utc_times(df)
+    if stage.startswith('weather'):
+        namespace = {'pd': pd, 'np': np, 'os': os, 'time': time,
+                     'glob': glob, 'weather_data_path': weather_dir,
+                     'top_airport_codes': None, 'weather_join': weather_join}
+        load_notebook_functions(WEATHER_NOTEBOOK, WEATHER_FUNCTIONS, namespace)
+        if stage != 'weather_load':
+            with contextlib.redirect_stdout(io.StringIO()):
+                namespace['weather_dict'] = namespace['load_weather_data']()
+    setup_memory = stage_peak_rss_mb()
+
+    # The notebook functions print progress every batch
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = _run_timed(stage, raw_csv, df, airport_dim, output_csv, namespace)
+    wall_time = time.time() - start_time
+
+    if os.path.exists(output_csv):
+        os.remove(output_csv)
+    return {
+        'stage': stage,
+        'rows': rows,
+        'wall_time': wall_time,
+        'rows_per_sec': rows / wall_time if wall_time > 0 else 0.0,
+        'peak_rss_mb': stage_peak_rss_mb(),
+        'setup_rss_mb': setup_memory
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(output_json, sizes=SIZES, stages=STAGES, work_dir="benchmark_data",
+              weather_max_rows=None, seed=2025):
+    """
+    Run every stage at every size, each in its own process, and write the
+    results to output_json. Sizes above weather_max_rows (if set) are
+    skipped for the weather matching stages, e.g. when benchmarking an old
+    commit with the row-wise matchers.
+    """
+    raw_files, weather_dir = prepare_inputs(work_dir, sizes, seed)
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for n_rows in sizes:
+        for stage in stages:
+            if (stage in ('weather_match', 'weather_match_dest') and weather_max_rows is not None
+                    and n_rows > weather_max_rows):
+                print(f"{stage:>20} {n_rows:>9}: skipped")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_stage, stage, raw_files[n_rows], weather_dir, work_dir).result()
+            result['size'] = n_rows
+            results.append(result)
+            print(f"{stage:>20} {n_rows:>9}: {result['wall_time']:8.2f}s "
+                  f"{result['rows_per_sec']:12.0f} rows/s {result['peak_rss_mb']:8.0f} MB peak")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'results': results
+    }
+    with open(output_json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output_json}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing and weather-join stages.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--work-dir", default="benchmark_data",
+                        help="where synthetic inputs are generated and reused")
+    parser.add_argument("--weather-max-rows", type=int, default=None,
+                        help="skip weather matching above this many rows")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--utc-check", action="store_true",
+                        help="only compare row-wise and vectorized to_utc")
+    args = parser.parse_args()
+
+    if args.utc_check:
+        benchmark_utc()
+        return
+    run_suite(args.output, args.sizes, args.stages, args.work_dir,
+              args.weather_max_rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
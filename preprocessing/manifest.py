@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_NAME = "manifest.json"
+
+# Source files whose contents define the cleaning logic
+CODE_FILES = ["preprocess.py"]
+
+
+def file_hash(path, block_size=1 << 20):
+    """
+    SHA-256 of a file, read in blocks so large BTS extracts are not loaded at once.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version():
+    """
+    Hash of the preprocessing source, so a code change invalidates old outputs.
+    """
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_FILES:
+        with open(os.path.join(here, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Records, per cleaned output, the hashes of everything it was built from.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def source_hash(self, path):
+        """
+        Hash path, reusing the recorded hash if its size and mtime are unchanged.
+        """
+        stat = os.stat(path)
+        for entry in self.entries.values():
+            if (entry.get("source") == os.path.abspath(path)
+                    and entry.get("source_size") == stat.st_size
+                    and entry.get("source_mtime") == stat.st_mtime):
+                return entry["source_hash"]
+        return file_hash(path)
+
+    def build_entry(self, source, output, inputs_hash, params):
+        stat = os.stat(source)
+        return {
+            "source": os.path.abspath(source),
+            "source_size": stat.st_size,
+            "source_mtime": stat.st_mtime,
+            "output": os.path.abspath(output),
+            **inputs_hash,
+            "params": params
+        }
+
+    def is_up_to_date(self, name, entry):
+        """
+        True if name was built from exactly the inputs in entry and still exists.
+        """
+        old = self.entries.get(name)
+        if old is None or not os.path.exists(old["output"]):
+            return False
+        keys = ["source_hash", "airport_info_hash", "airport_tz_hash",
+                "code_version", "params", "output"]
+        return all(old.get(k) == entry.get(k) for k in keys)
+
+    def update(self, name, entry, rows):
+        self.entries[name] = {**entry, "rows": rows,
+                              "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    def save(self):
+        """
+        Write the manifest atomically so an interrupted run cannot corrupt it.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,16 +1,156 @@
+import os
+import shutil
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import pytz
 
+UTC_COLUMNS = ['SCH_DEP_TIME_UTC', 'ACT_DEP_TIME_UTC',
+               'SCH_ARR_TIME_UTC', 'ACT_ARR_TIME_UTC']
+PARTITION_COLUMNS = ['YEAR', 'MONTH']
 
-def clean_flight_data(main_csv, airport_info_csv, airport_tz_csv, output_csv):
-    # Load data
-    main_data = pd.read_csv(main_csv)
+# Declared dtypes of the cleaned flight frame (see variables_explanation.md).
+# Low-cardinality strings are categories, HHMM times, minutes and delays are
+# nullable Int16 and measurements are float32.
+FLIGHT_SCHEMA = {
+    'YEAR': 'Int16', 'MONTH': 'Int8', 'DAY': 'Int8',
+    'WEEK': 'category', 'DATE': 'category',
+    'MKT_AIRLINE': 'category', 'MKT_FL_NUM': 'Int16',
+    'ORIGIN_AIRPORT_ID': 'Int32', 'ORIGIN_AIRPORT_SEQ_ID': 'Int32',
+    'ORIGIN_CITY_MARKET_ID': 'Int32',
+    'ORIGIN_IATA': 'category', 'ORIGIN_CITY': 'category',
+    'DEST_AIRPORT_ID': 'Int32', 'DEST_AIRPORT_SEQ_ID': 'Int32',
+    'DEST_CITY_MARKET_ID': 'Int32',
+    'DEST_IATA': 'category', 'DEST_CITY': 'category',
+    'SCH_DEP_TIME': 'Int16', 'ACT_DEP_TIME': 'Int16',
+    'DEP_DELAY': 'Int16', 'DEP_DELAY_NEW': 'Int16',
+    'TAXI_OUT': 'Int16', 'WHEELS_OFF': 'Int16', 'WHEELS_ON': 'Int16',
+    'TAXI_IN': 'Int16', 'SCH_ARR_TIME': 'Int16', 'ACT_ARR_TIME': 'Int16',
+    'ARR_DELAY': 'Int16', 'ARR_DELAY_NEW': 'Int16',
+    'CANCELLED': 'Int8', 'DIVERTED': 'Int8', 'CANCELLATION_CODE': 'category',
+    'SCH_DURATION': 'Int16', 'ACT_DURATION': 'Int16', 'AIR_TIME': 'Int16',
+    'DISTANCE': 'float32',
+    'CARRIER_DELAY': 'Int16', 'WEATHER_DELAY': 'Int16', 'NAS_DELAY': 'Int16',
+    'SECURITY_DELAY': 'Int16', 'LATE_AIRCRAFT_DELAY': 'Int16',
+    'TOTAL_ADD_GTIME': 'Int16',
+    'ORIGIN_TYPE': 'category', 'ORIGIN_ELEV': 'float32', 'ORIGIN_TZ': 'category',
+    'DEST_TYPE': 'category', 'DEST_ELEV': 'float32', 'DEST_TZ': 'category',
+    **{col: 'datetime64[ns, UTC]' for col in UTC_COLUMNS}
+}
+
+
+def to_utc(row, time_col, tz_col):
+    """
+    Convert a local HHMM time of one row to UTC (row-wise reference path).
+    """
+    try:
+        time_val = row[time_col]
+        if pd.isnull(time_val) or pd.isnull(row[tz_col]):
+            return pd.NaT
+        time_str = f"{int(time_val):04d}"
+        hour, minute = int(time_str[:2]), int(time_str[2:])
+        local_tz = pytz.timezone(row[tz_col])
+        naive = datetime(int(row['YEAR']), int(
+            row['MONTH']), int(row['DAY']), hour, minute)
+        localized = local_tz.localize(naive)
+        return localized.astimezone(pytz.utc)
+    except:
+        return pd.NaT
+
+
+def to_utc_vectorized(df, time_col, tz_col):
+    """
+    Convert local HHMM times to UTC, localizing each timezone group in one call.
+
+    Matches to_utc: missing times, missing or unknown timezones and invalid
+    dates give NaT. Ambiguous (fall-back) times resolve to standard time and
+    nonexistent (spring-forward) times use the pre-transition offset, which is
+    what pytz localize() does with its default is_dst=False.
+    """
+    result = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+
+    hhmm = pd.to_numeric(df[time_col], errors='coerce').to_numpy()
+    tz = df[tz_col].to_numpy()
+    valid = ~pd.isnull(hhmm) & ~pd.isnull(tz)
+
+    hhmm = np.where(valid, hhmm, 0).astype(np.int64)
+    hour, minute = hhmm // 100, hhmm % 100
+    valid &= (hhmm >= 0) & (hour < 24) & (minute < 60)
+
+    if valid.any():
+        naive = pd.DatetimeIndex(pd.to_datetime(pd.DataFrame({
+            'year': df['YEAR'].to_numpy()[valid],
+            'month': df['MONTH'].to_numpy()[valid],
+            'day': df['DAY'].to_numpy()[valid],
+            'hour': hour[valid],
+            'minute': minute[valid]
+        }), errors='coerce'))
+        positions = np.flatnonzero(valid)
+        one_hour = pd.Timedelta(hours=1)
+
+        # One localize call per timezone instead of one per row
+        groups = pd.Series(tz[valid]).groupby(tz[valid], sort=False).indices
+        for tz_name, group in groups.items():
+            local = naive[group]
+            try:
+                utc = local.tz_localize(
+                    tz_name, ambiguous=np.zeros(len(group), dtype=bool),
+                    nonexistent='NaT').tz_convert('UTC').tz_localize(None).to_numpy()
+                # Nonexistent times keep the offset in effect before the gap
+                gap = np.isnat(utc) & local.notna()
+                if gap.any():
+                    shifted = (local[gap] - one_hour).tz_localize(
+                        tz_name, ambiguous=np.zeros(gap.sum(), dtype=bool))
+                    utc[gap] = (shifted.tz_convert('UTC').tz_localize(None) +
+                                one_hour).to_numpy()
+            except Exception:
+                continue
+            result[positions[group]] = utc
+
+    return pd.Series(result, index=df.index).dt.tz_localize('UTC')
+
+
+def build_airport_dimension(airport_info_csv, airport_tz_csv):
+    """
+    Build one airport table keyed by IATA code with type, elevation and tz.
+    """
     our_airports = pd.read_csv(airport_info_csv)
     airport_tz = pd.read_csv(airport_tz_csv)[['iata_code', 'iana_tz']]
     our_airports = our_airports[our_airports['iata_code'].notna()]
 
+    airport_dim = our_airports.set_index('iata_code')[['type', 'elevation_ft']].join(
+        airport_tz.dropna(subset=['iata_code']).set_index('iata_code')['iana_tz'],
+        how='outer')
+    airport_dim.columns = ['TYPE', 'ELEV', 'TZ']
+    return airport_dim
+
+
+def attach_airport_attributes(main_data, airport_dim, iata_col, prefix):
+    """
+    Add {prefix}_TYPE/ELEV/TZ columns by integer-code gather instead of a merge.
+
+    IATA codes are factorized, the few unique codes are looked up in the
+    dimension index once, and each attribute is gathered with the row codes.
+    Unknown codes get NaN, like the left join this replaces.
+    """
+    codes, uniques = pd.factorize(main_data[iata_col])
+    positions = airport_dim.index.get_indexer(uniques)
+    row_positions = np.where(codes >= 0, positions[codes], -1)
+
+    for col in airport_dim.columns:
+        # The appended NaN is picked up by position -1 (missing airports)
+        values = np.append(airport_dim[col].to_numpy(dtype=object), np.nan)
+        gathered = values[row_positions]
+        if col == 'ELEV':
+            gathered = gathered.astype(float)
+        main_data[f"{prefix}_{col}"] = gathered
+    return main_data
+
+
+def recode_flight_data(main_data):
+    """
+    Recode weekday / cancellation codes and rename the raw BTS columns.
+    """
     # Recode variables
     day_map = {1: "Mon", 2: "Tue", 3: "Wed", 4: "Thu",
                5: "Fri", 6: "Sat", 7: "Sun", 9: np.nan}
@@ -30,51 +170,209 @@ def clean_flight_data(main_csv, airport_info_csv, airport_tz_csv, output_csv):
         "CRS_ARR_TIME": "SCH_ARR_TIME", "ARR_TIME": "ACT_ARR_TIME",
         "CRS_ELAPSED_TIME": "SCH_DURATION", "ACTUAL_ELAPSED_TIME": "ACT_DURATION"
     })
+    return main_data
 
-    # Merge airport info
-    main_data = main_data.merge(
-        our_airports.rename(columns={
-                            "iata_code": "ORIGIN_IATA", "type": "ORIGIN_TYPE", "elevation_ft": "ORIGIN_ELEV"}),
-        on="ORIGIN_IATA", how="left"
-    ).merge(
-        airport_tz.rename(
-            columns={"iata_code": "ORIGIN_IATA", "iana_tz": "ORIGIN_TZ"}),
-        on="ORIGIN_IATA", how="left"
-    ).merge(
-        our_airports.rename(columns={
-                            "iata_code": "DEST_IATA", "type": "DEST_TYPE", "elevation_ft": "DEST_ELEV"}),
-        on="DEST_IATA", how="left"
-    ).merge(
-        airport_tz.rename(
-            columns={"iata_code": "DEST_IATA", "iana_tz": "DEST_TZ"}),
-        on="DEST_IATA", how="left"
-    )
-
-    # Time conversion
-    def to_utc(row, time_col, tz_col):
-        try:
-            time_val = row[time_col]
-            if pd.isnull(time_val) or pd.isnull(row[tz_col]):
-                return pd.NaT
-            time_str = f"{int(time_val):04d}"
-            hour, minute = int(time_str[:2]), int(time_str[2:])
-            local_tz = pytz.timezone(row[tz_col])
-            naive = datetime(int(row['YEAR']), int(
-                row['MONTH']), int(row['DAY']), hour, minute)
-            localized = local_tz.localize(naive)
-            return localized.astimezone(pytz.utc)
-        except:
-            return pd.NaT
 
-    # Add UTC times
-    main_data['SCH_DEP_TIME_UTC'] = main_data.apply(
-        lambda r: to_utc(r, 'SCH_DEP_TIME', 'ORIGIN_TZ'), axis=1)
+def add_utc_times(main_data):
+    """
+    Add scheduled / actual departure and arrival times in UTC.
+    """
+    main_data['SCH_DEP_TIME_UTC'] = to_utc_vectorized(
+        main_data, 'SCH_DEP_TIME', 'ORIGIN_TZ')
     main_data['ACT_DEP_TIME_UTC'] = main_data['SCH_DEP_TIME_UTC'] + \
         pd.to_timedelta(main_data['DEP_DELAY'].fillna(0), unit='m')
     main_data['SCH_ARR_TIME_UTC'] = main_data['SCH_DEP_TIME_UTC'] + \
         pd.to_timedelta(main_data['SCH_DURATION'].fillna(0), unit='m')
     main_data['ACT_ARR_TIME_UTC'] = main_data['SCH_ARR_TIME_UTC'] + \
         pd.to_timedelta(main_data['ARR_DELAY'].fillna(0), unit='m')
+    return main_data
+
+
+def transform_flight_data(main_data, airport_dim):
+    """
+    Recode, rename, join airport info / timezones and add UTC times.
+    """
+    main_data = recode_flight_data(main_data)
+
+    # Attach airport info
+    main_data = attach_airport_attributes(main_data, airport_dim, 'ORIGIN_IATA', 'ORIGIN')
+    main_data = attach_airport_attributes(main_data, airport_dim, 'DEST_IATA', 'DEST')
+
+    # Add UTC times
+    return add_utc_times(main_data)
+
+
+def apply_schema(df, schema=FLIGHT_SCHEMA):
+    """
+    Cast the columns of df that appear in schema to their declared dtypes.
+    """
+    for col, dtype in schema.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+        elif dtype.startswith('datetime64'):
+            df[col] = pd.to_datetime(df[col], utc=True)
+        elif dtype.startswith('Int'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype(dtype)
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    return df
+
+
+def memory_report(df, schema=FLIGHT_SCHEMA):
+    """
+    Print and return per-column memory use before and after apply_schema.
+    """
+    before = df.memory_usage(index=False, deep=True)
+    after = apply_schema(df.copy(), schema).memory_usage(index=False, deep=True)
+
+    report = pd.DataFrame({'before_bytes': before, 'after_bytes': after})
+    report['saved_pct'] = (1 - report['after_bytes'] / report['before_bytes']) * 100
+    report.loc['TOTAL'] = [before.sum(), after.sum(),
+                           (1 - after.sum() / before.sum()) * 100]
+
+    print(report.to_string(float_format=lambda x: f"{x:.1f}"))
+    print(f"Total: {before.sum() / 1024 ** 2:.1f} MB -> {after.sum() / 1024 ** 2:.1f} MB")
+    return report
+
+
+def write_flight_parquet(df, output_dir, partition_by_origin=False):
+    """
+    Append cleaned flight data to a Parquet dataset partitioned by YEAR/MONTH
+    (and ORIGIN_IATA if partition_by_origin is set).
+    """
+    partition_cols = PARTITION_COLUMNS + \
+        (['ORIGIN_IATA'] if partition_by_origin else [])
+    # Partition keys are stored in directory names; keep them plain ints so
+    # the nullable dtype metadata does not clash with the partition type
+    df = df.astype({col: int for col in PARTITION_COLUMNS})
+    df.to_parquet(
+        output_dir, engine='pyarrow', partition_cols=partition_cols, index=False)
+
+
+def load_flight_data(path, columns=None, years=None, months=None, origins=None,
+                     schema=FLIGHT_SCHEMA):
+    """
+    Load cleaned flight data from a CSV file or a partitioned Parquet dataset
+    and apply schema (pass schema=None to keep the raw dtypes).
+
+    For Parquet, only the requested columns are read and the years / months /
+    origins filters prune whole partitions before any data is loaded.
+    """
+    if str(path).endswith('.csv'):
+        # Parse categories directly so the object strings are never held
+        category_dtypes = {col: 'category' for col, dtype in (schema or {}).items()
+                           if dtype == 'category'}
+        df = pd.read_csv(path, usecols=columns, dtype=category_dtypes,
+                         low_memory=False)
+        if years is not None:
+            df = df[df['YEAR'].isin(years)]
+        if months is not None:
+            df = df[df['MONTH'].isin(months)]
+        if origins is not None:
+            df = df[df['ORIGIN_IATA'].isin(origins)]
+        return apply_schema(df, schema) if schema else df
+
+    filters = []
+    if years is not None:
+        filters.append(('YEAR', 'in', list(years)))
+    if months is not None:
+        filters.append(('MONTH', 'in', list(months)))
+    if origins is not None:
+        filters.append(('ORIGIN_IATA', 'in', list(origins)))
+
+    df = pd.read_parquet(path, engine='pyarrow', columns=columns,
+                         filters=filters or None)
+
+    # Partition keys come back as categories; restore the declared dtype
+    for col in PARTITION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(int)
+    return apply_schema(df, schema) if schema else df
+
+
+def remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def replace_path(src, dst):
+    """
+    Move a finished file or dataset directory onto dst. A directory cannot
+    be renamed over a non-empty one, so the old one is moved aside first.
+    """
+    if os.path.isdir(dst):
+        old = f"{dst}.old-{os.getpid()}"
+        os.replace(dst, old)
+        os.replace(src, dst)
+        shutil.rmtree(old)
+    else:
+        os.replace(src, dst)
+
+
+def clean_flight_data(main_csv, airport_info_csv, airport_tz_csv, output_csv,
+                      chunksize=None, output_format='csv', partition_by_origin=False,
+                      airport_dim=None):
+    """
+    Clean a raw BTS on-time CSV and save it to output_csv. Returns the number
+    of rows written.
+
+    With chunksize set, the input is streamed in chunks of that many rows and
+    each cleaned chunk is appended to the output, so peak memory is bounded by
+    the chunk size instead of the file size.
+
+    With output_format='parquet', output_csv is a dataset directory
+    partitioned by YEAR/MONTH (and ORIGIN_IATA if partition_by_origin is set);
+    read it back with load_flight_data.
+
+    airport_dim is an optional table from build_airport_dimension, so callers
+    cleaning many files build it only once.
+
+    The output is written to a temporary path and renamed into place when
+    complete, so a crash never leaves a truncated file under output_csv.
+    """
+    if output_format not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    # Load data
+    if airport_dim is None:
+        airport_dim = build_airport_dimension(airport_info_csv, airport_tz_csv)
+
+    tmp_output = f"{output_csv}.tmp-{os.getpid()}"
+    remove_path(tmp_output)
+
+    def save(data, first):
+        data = apply_schema(data)
+        if output_format == 'parquet':
+            write_flight_parquet(data, tmp_output, partition_by_origin)
+        else:
+            data.to_csv(tmp_output, mode='w' if first else 'a',
+                        header=first, index=False)
+
+    try:
+        if chunksize is None:
+            main_data = pd.read_csv(main_csv)
+            main_data = transform_flight_data(main_data, airport_dim)
+
+            # Save
+            save(main_data, True)
+            rows = len(main_data)
+        else:
+            # Stream chunks and append to the output
+            first = True
+            rows = 0
+            for chunk in pd.read_csv(main_csv, chunksize=chunksize):
+                chunk = transform_flight_data(chunk, airport_dim)
+                save(chunk, first)
+                rows += len(chunk)
+                first = False
+    except BaseException:
+        remove_path(tmp_output)
+        raise
 
-    # Save
-    main_data.to_csv(output_csv, index=False)
+    if os.path.exists(tmp_output):
+        replace_path(tmp_output, output_csv)
+    return rows
@@ -0,0 +1,229 @@
+import argparse
+import glob
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from manifest import Manifest, code_version, file_hash
+from preprocess import build_airport_dimension, clean_flight_data, remove_path
+
+RAW_FILE_NAME = "T_ONTIME_MARKETING.csv"
+
+# Airport dimension built once per worker process by init_worker
+_airport_dim = None
+
+
+def find_raw_files(inputs):
+    """
+    Expand directories and glob patterns into a sorted list of raw BTS CSVs.
+
+    A directory is searched for <folder>/T_ONTIME_MARKETING.csv (the layout
+    used in data.ipynb) and for plain *.csv files.
+    """
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            files.extend(glob.glob(os.path.join(pattern, "*", RAW_FILE_NAME)))
+            files.extend(glob.glob(os.path.join(pattern, "*.csv")))
+        else:
+            files.extend(glob.glob(pattern))
+    return sorted(set(files))
+
+
+def output_name(raw_csv):
+    """
+    Name the output after the month folder (e.g. May2021) or the file stem.
+    """
+    if os.path.basename(raw_csv) == RAW_FILE_NAME:
+        return os.path.basename(os.path.dirname(os.path.abspath(raw_csv)))
+    return os.path.splitext(os.path.basename(raw_csv))[0]
+
+
+def peak_memory_mb():
+    """
+    Peak resident memory of the current process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_memory():
+    """
+    Start a new peak-RSS window for this process by resetting VmHWM
+    (Linux only). Returns False if that is not supported.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def current_peak_memory_mb():
+    """
+    VmHWM in MB: the peak RSS since the last reset_peak_memory(), or None.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def init_worker(airport_info_csv, airport_tz_csv):
+    global _airport_dim
+    _airport_dim = build_airport_dimension(airport_info_csv, airport_tz_csv)
+
+
+def process_file(raw_csv, output_path, chunksize, output_format, partition_by_origin):
+    """
+    Clean one file in a worker. peak_memory_mb is this file's own peak where
+    VmHWM can be reset; elsewhere it is the worker's lifetime peak, and
+    peak_memory_scope says which.
+    """
+    per_file = reset_peak_memory()
+    start_time = time.time()
+    rows = clean_flight_data(
+        raw_csv, None, None, output_path,
+        chunksize=chunksize,
+        output_format=output_format,
+        partition_by_origin=partition_by_origin,
+        airport_dim=_airport_dim
+    )
+    wall_time = time.time() - start_time
+    peak = current_peak_memory_mb() if per_file else None
+    return {
+        'file': raw_csv,
+        'output': output_path,
+        'rows': rows,
+        'wall_time': wall_time,
+        'rows_per_sec': rows / wall_time if wall_time > 0 else 0.0,
+        'peak_memory_mb': peak if peak is not None else peak_memory_mb(),
+        'peak_memory_scope': 'file' if peak is not None else 'worker',
+        'pid': os.getpid()
+    }
+
+
+def run(raw_files, output_dir, airport_info_csv, airport_tz_csv, workers=None,
+        chunksize=None, output_format='csv', partition_by_origin=False, force=False):
+    """
+    Clean raw_files across a process pool and return per-file statistics.
+
+    Outputs whose source file, lookup tables, code version and output options
+    match the manifest in output_dir are skipped unless force is set.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    extension = ".csv" if output_format == 'csv' else ""
+
+    manifest = Manifest(output_dir)
+    shared_hash = {
+        'airport_info_hash': file_hash(airport_info_csv),
+        'airport_tz_hash': file_hash(airport_tz_csv),
+        'code_version': code_version()
+    }
+    params = {'output_format': output_format,
+              'partition_by_origin': partition_by_origin}
+
+    pending = []
+    results = []
+    for raw_csv in raw_files:
+        name = output_name(raw_csv)
+        output_path = os.path.join(output_dir, name + extension)
+        entry = manifest.build_entry(
+            raw_csv, output_path,
+            {'source_hash': manifest.source_hash(raw_csv), **shared_hash}, params)
+        if not force and manifest.is_up_to_date(name, entry):
+            # Remember the current size/mtime so the next run need not rehash
+            manifest.entries[name].update(source_size=entry['source_size'],
+                                          source_mtime=entry['source_mtime'])
+            print(f"{name}: up to date, skipping")
+            results.append({'file': raw_csv, 'status': 'skipped'})
+            continue
+        # Partial outputs of a killed run (completed outputs are renamed into place)
+        for stale in glob.glob(glob.escape(output_path) + ".tmp-*"):
+            remove_path(stale)
+        pending.append((raw_csv, name, output_path, entry))
+
+    manifest.save()
+    if not pending:
+        print("\nAll outputs are up to date.")
+        return results
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(airport_info_csv, airport_tz_csv)) as pool:
+        futures = {}
+        for raw_csv, name, output_path, entry in pending:
+            future = pool.submit(process_file, raw_csv, output_path, chunksize,
+                                 output_format, partition_by_origin)
+            futures[future] = (raw_csv, name, entry)
+
+        for future in as_completed(futures):
+            raw_csv, name, entry = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error processing {raw_csv}: {e}")
+                results.append({'file': raw_csv, 'status': 'error', 'reason': str(e)})
+                continue
+            result['status'] = 'success'
+            results.append(result)
+
+            # Record each output as soon as it is done
+            manifest.update(name, entry, result['rows'])
+            manifest.save()
+            print(f"{name}: {result['rows']:,} rows in "
+                  f"{result['wall_time']:.2f}s ({result['rows_per_sec']:,.0f} rows/s, "
+                  f"{'peak' if result['peak_memory_scope'] == 'file' else 'worker peak'} "
+                  f"{result['peak_memory_mb']:.0f} MB, pid {result['pid']})")
+
+    total_time = time.time() - start_time
+    total_rows = sum(r.get('rows', 0) for r in results)
+    success_count = sum(1 for r in results if r['status'] == 'success')
+    print(f"\nProcessed {success_count}/{len(pending)} files, {total_rows:,} rows "
+          f"in {total_time:.2f}s ({total_rows / max(total_time, 1e-9):,.0f} rows/s overall)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Clean many raw BTS on-time files in parallel.")
+    parser.add_argument("inputs", nargs="+",
+                        help="Raw data directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="cleaned_data")
+    parser.add_argument("--airport-info", default="our_airports_info.csv")
+    parser.add_argument("--airport-tz", default="airport_timezone.csv")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream each file in chunks of this many rows")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--partition-by-origin", action="store_true")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild outputs even if the manifest says they are up to date")
+    args = parser.parse_args()
+
+    raw_files = find_raw_files(args.inputs)
+    if not raw_files:
+        print("No raw BTS files found.")
+        sys.exit(1)
+    print(f"Found {len(raw_files)} raw files to process")
+
+    results = run(raw_files, args.output_dir, args.airport_info, args.airport_tz,
+                  workers=args.workers, chunksize=args.chunksize,
+                  output_format=args.format,
+                  partition_by_origin=args.partition_by_origin,
+                  force=args.force)
+    if any(r['status'] == 'error' for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
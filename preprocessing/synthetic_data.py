@@ -0,0 +1,350 @@
+import argparse
+import calendar
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AIRPORTS_GEOJSON = os.path.join(REPO_ROOT, "earth-usa_visualize", "assets", "airports.geojson")
+DISTANCES_CSV = os.path.join(REPO_ROOT, "earth-usa_visualize", "models", "top30_airport_distances.csv")
+AIRPORT_TZ_CSV = os.path.join(REPO_ROOT, "preprocessing", "airport_timezone.csv")
+
+# Approximate marketing-carrier shares of US domestic flights
+AIRLINES = {
+    "AA": 0.24, "DL": 0.22, "UA": 0.20, "WN": 0.17, "AS": 0.06,
+    "B6": 0.04, "NK": 0.03, "F9": 0.02, "G4": 0.01, "HA": 0.01
+}
+CANCEL_CODES = {"A": 0.35, "B": 0.35, "C": 0.25, "D": 0.05}
+
+# Columns of T_ONTIME_MARKETING.csv in BTS order, as read by clean_flight_data
+BTS_COLUMNS = [
+    'YEAR', 'MONTH', 'DAY_OF_MONTH', 'DAY_OF_WEEK', 'FL_DATE',
+    'MKT_UNIQUE_CARRIER', 'MKT_CARRIER_FL_NUM',
+    'ORIGIN_AIRPORT_ID', 'ORIGIN_AIRPORT_SEQ_ID', 'ORIGIN_CITY_MARKET_ID',
+    'ORIGIN', 'ORIGIN_CITY_NAME',
+    'DEST_AIRPORT_ID', 'DEST_AIRPORT_SEQ_ID', 'DEST_CITY_MARKET_ID',
+    'DEST', 'DEST_CITY_NAME',
+    'CRS_DEP_TIME', 'DEP_TIME', 'DEP_DELAY', 'DEP_DELAY_NEW',
+    'TAXI_OUT', 'WHEELS_OFF', 'WHEELS_ON', 'TAXI_IN',
+    'CRS_ARR_TIME', 'ARR_TIME', 'ARR_DELAY', 'ARR_DELAY_NEW',
+    'CANCELLED', 'CANCELLATION_CODE', 'CRS_ELAPSED_TIME', 'ACTUAL_ELAPSED_TIME',
+    'AIR_TIME', 'DISTANCE', 'CARRIER_DELAY', 'WEATHER_DELAY', 'NAS_DELAY',
+    'SECURITY_DELAY', 'LATE_AIRCRAFT_DELAY', 'TOTAL_ADD_GTIME'
+]
+
+
+def load_airports(geojson_path=AIRPORTS_GEOJSON, airport_tz_csv=AIRPORT_TZ_CSV):
+    """
+    Load airports (IATA, city, coordinates, enplanements, timezone) from the
+    visualization geojson.
+    """
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        features = json.load(f)["features"]
+
+    airports = pd.DataFrame({
+        'IATA': [feat['properties']['IATA'] for feat in features],
+        'CITY': [feat['properties']['AIRPT_NAME'] for feat in features],
+        'LON': [feat['geometry']['coordinates'][0] for feat in features],
+        'LAT': [feat['geometry']['coordinates'][1] for feat in features],
+        'ENPLANEMENTS': [feat['properties']['TOT_ENP'] for feat in features]
+    })
+
+    airport_tz = pd.read_csv(airport_tz_csv)[['iata_code', 'iana_tz']]
+    airports = airports.merge(airport_tz, left_on='IATA', right_on='iata_code', how='left')
+    airports['TZ'] = airports['iana_tz'].fillna('America/New_York')
+    airports = airports.drop(columns=['iata_code', 'iana_tz'])
+
+    airports = airports.dropna(subset=['LON', 'LAT', 'ENPLANEMENTS'])
+    airports = airports.sort_values('ENPLANEMENTS', ascending=False).reset_index(drop=True)
+    # BTS-style numeric IDs
+    airports['AIRPORT_ID'] = 10000 + airports.index
+    airports['CITY_MARKET_ID'] = 30000 + airports.index
+    return airports
+
+
+def distance_matrix(airports, distances_csv=DISTANCES_CSV):
+    """
+    Great-circle distances in miles, overridden by the real BTS distances
+    recorded for the top-30 airport pairs.
+    """
+    lat = np.radians(airports['LAT'].to_numpy())
+    lon = np.radians(airports['LON'].to_numpy())
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    dist = np.round(2 * 3958.8 * np.arcsin(np.sqrt(a)))
+
+    if os.path.exists(distances_csv):
+        known = pd.read_csv(distances_csv).dropna(subset=['Distance'])
+        position = pd.Series(airports.index, index=airports['IATA'])
+        known = known[known['Origin'].isin(position.index) & known['Destination'].isin(position.index)]
+        i = position[known['Origin']].to_numpy()
+        j = position[known['Destination']].to_numpy()
+        dist[i, j] = known['Distance'].to_numpy()
+        dist[j, i] = known['Distance'].to_numpy()
+    return dist
+
+
+def utc_offsets(airports, year, month):
+    """
+    UTC offset in minutes of each airport in the middle of the month.
+    """
+    mid_month = datetime(year, month, 15, 12)
+    offsets = {tz: pytz.timezone(tz).utcoffset(mid_month).total_seconds() / 60
+               for tz in airports['TZ'].unique()}
+    return airports['TZ'].map(offsets).to_numpy()
+
+
+def to_hhmm(minutes):
+    minutes = np.mod(minutes, 1440)
+    return (minutes // 60) * 100 + minutes % 60
+
+
+def generate_flight_chunk(rng, n_rows, year, month, airports, dist, offsets):
+    """
+    Generate n_rows BTS-shaped flights for one month.
+    """
+    weights = airports['ENPLANEMENTS'].to_numpy(dtype=float)
+    weights /= weights.sum()
+    n_airports = len(airports)
+
+    origin = rng.choice(n_airports, n_rows, p=weights)
+    dest = rng.choice(n_airports, n_rows, p=weights)
+    same = origin == dest
+    while same.any():
+        dest[same] = rng.choice(n_airports, same.sum(), p=weights)
+        same = origin == dest
+
+    days_in_month = calendar.monthrange(year, month)[1]
+    day = rng.integers(1, days_in_month + 1, n_rows)
+    first_weekday = calendar.weekday(year, month, 1)  # Monday=0
+    day_of_week = (first_weekday + day - 1) % 7 + 1   # BTS: Monday=1 ... Sunday=7
+
+    carriers = np.array(list(AIRLINES))
+    carrier = rng.choice(carriers, n_rows, p=list(AIRLINES.values()))
+
+    distance = dist[origin, dest]
+    crs_elapsed = np.round(30 + distance / 7.5).astype(int)
+
+    # Departures cluster between 6am and 10pm local time
+    crs_dep_min = np.clip(rng.normal(810, 240, n_rows), 300, 1439).astype(int) // 5 * 5
+    tz_shift = (offsets[dest] - offsets[origin]).astype(int)
+    crs_arr_min = crs_dep_min + crs_elapsed + tz_shift
+
+    # Mostly slightly early, with a long tail of delays
+    delayed = rng.random(n_rows) < 0.35
+    dep_delay = np.where(delayed, np.round(rng.exponential(40, n_rows)) + 1,
+                         -np.round(rng.exponential(5, n_rows)))
+    arr_delay = np.round(dep_delay + rng.normal(-5, 10, n_rows))
+    taxi_out = np.round(rng.gamma(4, 4, n_rows)) + 5
+    taxi_in = np.round(rng.gamma(2, 3, n_rows)) + 2
+    actual_elapsed = crs_elapsed + arr_delay - dep_delay
+    air_time = np.maximum(actual_elapsed - taxi_out - taxi_in, 15)
+
+    dep_min = crs_dep_min + dep_delay
+    arr_min = crs_arr_min + arr_delay
+
+    cancelled = rng.random(n_rows) < 0.015
+    cancel_code = np.where(
+        cancelled, rng.choice(list(CANCEL_CODES), n_rows, p=list(CANCEL_CODES.values())), None)
+
+    # Split arrival delays of 15+ minutes across the five causes
+    cause_share = rng.dirichlet([3, 1, 3, 0.1, 4], n_rows)
+    causes = np.where((arr_delay >= 15)[:, None], np.round(cause_share * arr_delay[:, None]), np.nan)
+
+    def flown(values):
+        return np.where(cancelled, np.nan, values).astype(float)
+
+    airport_id = airports['AIRPORT_ID'].to_numpy()
+    market_id = airports['CITY_MARKET_ID'].to_numpy()
+    iata = airports['IATA'].to_numpy()
+    city = airports['CITY'].to_numpy()
+    # Format one FL_DATE string per day and gather, instead of per row
+    fl_dates = np.array([f"{month}/{d}/{year} 12:00:00 AM" for d in range(1, days_in_month + 1)])
+
+    return pd.DataFrame({
+        'YEAR': np.full(n_rows, year),
+        'MONTH': np.full(n_rows, month),
+        'DAY_OF_MONTH': day,
+        'DAY_OF_WEEK': day_of_week,
+        'FL_DATE': fl_dates[day - 1],
+        'MKT_UNIQUE_CARRIER': carrier,
+        'MKT_CARRIER_FL_NUM': rng.integers(1, 7000, n_rows),
+        'ORIGIN_AIRPORT_ID': airport_id[origin],
+        'ORIGIN_AIRPORT_SEQ_ID': airport_id[origin] * 100 + 1,
+        'ORIGIN_CITY_MARKET_ID': market_id[origin],
+        'ORIGIN': iata[origin],
+        'ORIGIN_CITY_NAME': city[origin],
+        'DEST_AIRPORT_ID': airport_id[dest],
+        'DEST_AIRPORT_SEQ_ID': airport_id[dest] * 100 + 1,
+        'DEST_CITY_MARKET_ID': market_id[dest],
+        'DEST': iata[dest],
+        'DEST_CITY_NAME': city[dest],
+        'CRS_DEP_TIME': to_hhmm(crs_dep_min),
+        'DEP_TIME': flown(to_hhmm(dep_min)),
+        'DEP_DELAY': flown(dep_delay),
+        'DEP_DELAY_NEW': flown(np.maximum(dep_delay, 0)),
+        'TAXI_OUT': flown(taxi_out),
+        'WHEELS_OFF': flown(to_hhmm(dep_min + taxi_out)),
+        'WHEELS_ON': flown(to_hhmm(arr_min - taxi_in)),
+        'TAXI_IN': flown(taxi_in),
+        'CRS_ARR_TIME': to_hhmm(crs_arr_min),
+        'ARR_TIME': flown(to_hhmm(arr_min)),
+        'ARR_DELAY': flown(arr_delay),
+        'ARR_DELAY_NEW': flown(np.maximum(arr_delay, 0)),
+        'CANCELLED': cancelled.astype(float),
+        'CANCELLATION_CODE': cancel_code,
+        'CRS_ELAPSED_TIME': crs_elapsed.astype(float),
+        'ACTUAL_ELAPSED_TIME': flown(actual_elapsed),
+        'AIR_TIME': flown(air_time),
+        'DISTANCE': distance,
+        'CARRIER_DELAY': flown(causes[:, 0]),
+        'WEATHER_DELAY': flown(causes[:, 1]),
+        'NAS_DELAY': flown(causes[:, 2]),
+        'SECURITY_DELAY': flown(causes[:, 3]),
+        'LATE_AIRCRAFT_DELAY': flown(causes[:, 4]),
+        'TOTAL_ADD_GTIME': np.full(n_rows, np.nan)
+    }, columns=BTS_COLUMNS)
+
+
+def write_flight_csv(output_csv, n_rows, year, month, airports=None, seed=2025,
+                     chunk_rows=1_000_000):
+    """
+    Write a synthetic T_ONTIME_MARKETING.csv for one month, chunk by chunk.
+    Each chunk draws from its own child seed, so the output only depends on
+    seed and chunk_rows.
+    """
+    if airports is None:
+        airports = load_airports()
+    dist = distance_matrix(airports)
+    offsets = utc_offsets(airports, year, month)
+
+    out_dir = os.path.dirname(output_csv)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    child_seeds = np.random.SeedSequence([seed, year, month]).spawn(n_chunks)
+    written = 0
+    for i, child in enumerate(child_seeds):
+        size = min(chunk_rows, n_rows - written)
+        chunk = generate_flight_chunk(np.random.default_rng(child), size, year, month,
+                                      airports, dist, offsets)
+        chunk.to_csv(output_csv, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        written += size
+    return written
+
+
+def generate_weather_month(rng, station_id, name, lat, lon, elevation, year, month):
+    """
+    One station-month of NCEI daily-summaries rows (metric units), with
+    columns in the order written by weather_downloader2.standardize_columns.
+    """
+    days = pd.date_range(datetime(year, month, 1), periods=calendar.monthrange(year, month)[1])
+    n = len(days)
+
+    # Warmer in the south and in mid-summer
+    season = np.cos((days.dayofyear.to_numpy() - 200) / 365 * 2 * np.pi)
+    tavg = 32 - 0.5 * (lat - 25) - 8 * (1 - season) + rng.normal(0, 2.5, n)
+    spread = rng.uniform(6, 14, n)
+    rainy = rng.random(n) < 0.3
+    prcp = np.where(rainy, np.round(rng.gamma(0.8, 8, n), 1), 0.0)
+    awnd = np.round(rng.gamma(4, 1, n), 1)
+    wsf2 = np.round(awnd * rng.uniform(1.8, 2.6, n), 1)
+    tmin = tavg - spread / 2
+
+    return pd.DataFrame({
+        'STATION': station_id,
+        'NAME': name,
+        'DATE': days.strftime('%Y-%m-%d'),
+        'LATITUDE': lat,
+        'LONGITUDE': lon,
+        'ELEVATION': elevation,
+        'TAVG': np.round(tavg, 1),
+        'TMAX': np.round(tavg + spread / 2, 1),
+        'TMIN': np.round(tmin, 1),
+        'PRCP': prcp,
+        'SNOW': np.where(rainy & (tmin < 0), np.round(prcp * 10), 0.0),
+        'AWND': awnd,
+        'WSF2': wsf2,
+        'WSF5': np.round(wsf2 * rng.uniform(1.1, 1.4, n), 1),
+        # Most stations do not report RH/VIS on daily summaries
+        'RH': np.where(rng.random(n) < 0.2, np.round(rng.uniform(30, 95, n)), np.nan),
+        'VIS': np.where(rng.random(n) < 0.2, np.round(rng.uniform(2, 16, n), 1), np.nan),
+        'WT01': np.where(rng.random(n) < 0.1, 1.0, np.nan),
+        'WT03': np.where(rainy & (rng.random(n) < 0.3), 1.0, np.nan)
+    })
+
+
+def write_weather_files(output_dir, years, months, airports=None, top_n=30,
+                        stations_per_airport=1, seed=2025):
+    """
+    Write IATA_YYYY_Mon_N.csv weather files for the top_n airports by
+    enplanements, one file per station and month.
+    """
+    if airports is None:
+        airports = load_airports()
+    os.makedirs(output_dir, exist_ok=True)
+
+    count = 0
+    for rank, airport in airports.head(top_n).iterrows():
+        rng = np.random.default_rng([seed, rank])
+        city, state = (airport['CITY'].split(', ') + [''])[:2]
+        for n in range(1, stations_per_airport + 1):
+            station_id = f"USW000{rank:03d}{n:02d}"
+            name = f"{city.upper()} {airport['IATA']} AIRPORT, {state} US"
+            lat = round(airport['LAT'] + rng.normal(0, 0.02), 4)
+            lon = round(airport['LON'] + rng.normal(0, 0.02), 4)
+            elevation = round(rng.uniform(0, 400), 1)
+            for year in years:
+                for month in months:
+                    df = generate_weather_month(rng, station_id, name, lat, lon, elevation, year, month)
+                    month_name = datetime(year, month, 1).strftime('%b')
+                    df.to_csv(os.path.join(output_dir, f"{airport['IATA']}_{year}_{month_name}_{n}.csv"),
+                              index=False)
+                    count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic BTS flight and NCEI weather data for offline benchmarks.")
+    parser.add_argument("-o", "--output-dir", default="synthetic_data",
+                        help="root directory for the generated files")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000,
+                        help="flight rows per month")
+    parser.add_argument("--years", type=int, nargs="+", default=[2021])
+    parser.add_argument("--months", type=int, nargs="+", default=[5])
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--top-n", type=int, default=30,
+                        help="airports that get weather files")
+    parser.add_argument("--stations-per-airport", type=int, default=1)
+    parser.add_argument("--no-weather", action="store_true")
+    args = parser.parse_args()
+
+    airports = load_airports()
+    for year in args.years:
+        for month in args.months:
+            # Same <MonthYYYY>/T_ONTIME_MARKETING.csv layout as the raw downloads
+            folder = datetime(year, month, 1).strftime('%B') + str(year)
+            output_csv = os.path.join(args.output_dir, folder, "T_ONTIME_MARKETING.csv")
+            start = time.perf_counter()
+            rows = write_flight_csv(output_csv, args.rows, year, month, airports,
+                                    args.seed, args.chunk_rows)
+            print(f"{output_csv}: {rows} rows in {time.perf_counter() - start:.1f}s")
+
+    if not args.no_weather:
+        weather_dir = os.path.join(args.output_dir, "weather_data")
+        count = write_weather_files(weather_dir, args.years, args.months, airports,
+                                    args.top_n, args.stations_per_airport, args.seed)
+        print(f"{weather_dir}: {count} weather files")
+
+
+if __name__ == "__main__":
+    main()